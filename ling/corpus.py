@@ -0,0 +1,108 @@
+import array
+import bisect
+import logging
+import time
+from typing import Iterable, List
+
+import ling.db as db
+
+# Type code of arrays with ids
+ID_TYPECODE = "q"
+
+
+class Csr:
+    """
+    Compressed sparse rows - relation from ids to lists of ids in three flat arrays.
+    Values of key keys[i] are values[offsets[i]:offsets[i + 1]], keys are sorted
+    """
+
+    def __init__(self):
+        self.keys = array.array(ID_TYPECODE)
+        self.offsets = array.array(ID_TYPECODE, [0])
+        self.values = array.array(ID_TYPECODE)
+
+    @classmethod
+    def from_sorted_pairs(cls, rows: Iterable[tuple]) -> "Csr":
+        """Builds relation from (key, value) pairs ordered by key"""
+        result = cls()
+        last_key = None
+        for key, value in rows:
+            if key != last_key:
+                if last_key is not None:
+                    result.offsets.append(len(result.values))
+                result.keys.append(key)
+                last_key = key
+            result.values.append(value)
+        if last_key is not None:
+            result.offsets.append(len(result.values))
+        return result
+
+    def get(self, key: int) -> array.array:
+        idx = bisect.bisect_left(self.keys, key)
+        if idx < len(self.keys) and self.keys[idx] == key:
+            return self.values[self.offsets[idx]:self.offsets[idx + 1]]
+        return array.array(ID_TYPECODE)
+
+    def get_many(self, keys: Iterable[int]) -> List[int]:
+        """Returns sorted distinct values of all keys"""
+        result = set()
+        for key in keys:
+            result.update(self.get(key))
+        return sorted(result)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(it.itemsize * len(it) for it in (self.keys, self.offsets, self.values))
+
+
+class CorpusIndex:
+    """
+    Read only copy of relations between records of database, stored in arrays, so navigation between them
+    doesn't need queries. Records themselves are not stored, only their ids. Only relations used by navigation
+    are stored, relations of sentences are known from their records.
+    Index is valid while DB.write_version is equal to write_version
+    """
+
+    def __init__(self, database: db.DB):
+        start_time = time.perf_counter()
+        self.write_version = database.write_version
+
+        # Words sorted by id, initial_forms has 0 for words with no initial form
+        self.word_ids = array.array(ID_TYPECODE)
+        self.word_initial_forms = array.array(ID_TYPECODE)
+        sql = """select id, coalesce(initial_form_id, 0) from word order by id"""
+        for id_, initial_form_id in database.cursor.execute(sql):
+            self.word_ids.append(id_)
+            self.word_initial_forms.append(initial_form_id)
+
+        def load(sql: str) -> Csr:
+            return Csr.from_sorted_pairs(database.cursor.execute(sql))
+
+        self.col_words = load("""select col_id, word_id from collocation_junction order by col_id, idx""")
+        self.word_cols = load("""select distinct word_id, col_id from collocation_junction
+                                 order by word_id, col_id""")
+        self.sg_cols = load("""select sg_id, id from collocation order by sg_id, id""")
+        self.col_cons = load("""select predicate, id from conn union select object, id from conn
+                                order by 1, 2""")
+        self.word_sents = load("""select distinct word_id, sent_id from sentence_word_junction
+                                  order by word_id, sent_id""")
+        self.initial_form_words = load("""select initial_form_id, id from word where initial_form_id is not null
+                                          order by initial_form_id, id""")
+        logging.info("Built corpus index of %d words in %.3fs, %d bytes",
+                     len(self.word_ids), time.perf_counter() - start_time, self.nbytes)
+
+    @property
+    def relations(self) -> List[Csr]:
+        return [self.col_words, self.word_cols, self.sg_cols, self.col_cons, self.word_sents, self.initial_form_words]
+
+    @property
+    def nbytes(self) -> int:
+        columns = (self.word_ids, self.word_initial_forms)
+        return sum(it.itemsize * len(it) for it in columns) + sum(it.nbytes for it in self.relations)
+
+    def get_initial_form_word_ids(self) -> List[db.WordID]:
+        """Returns sorted ids of words which don't have initial form, so they are initial forms themselves"""
+        return [id_ for id_, initial_form_id in zip(self.word_ids, self.word_initial_forms) if not initial_form_id]
+
+    def get_words_of_sgs(self, sg_ids: Iterable[db.SemanticGroupID]) -> List[db.WordID]:
+        return self.col_words.get_many(self.sg_cols.get_many(sg_ids))
@@ -2,13 +2,20 @@
 File containing functions forming an API for interacting with SQL database
 """
 import sqlite3
+import threading
+import os
+import urllib.request
 import typing
-from typing import Union, List
+from typing import Union, List, Dict, Iterable, Tuple
 import logging
+import time
 import functools
+import contextlib
+import itertools
 import dataclasses
-from ling.tables_create import TABLES
+from ling.tables_create import TABLES, MIGRATIONS, FTS_TABLES
 import ling.word 
+import ling.fuzzy
 
 
 def flatten_by_idx(arr, idx):
@@ -24,6 +31,72 @@ def safe_unpack(_list: list):
     return _list[0]
 
 
+# Number of host parameters used in one 'in (...)' query.
+# Old sqlite versions limit statements to 999 variables.
+# SQLite 3.24+ is required (upsert in triggers), full-text search is used if library supports it,
+#  see get_fts_support
+SQL_MAX_VARIABLES = 500
+
+
+def chunked(arr: list, size: int):
+    for start in range(0, len(arr), size):
+        yield arr[start:start + size]
+
+
+# Default number of rows fetched at once by iter_* methods
+ITER_CHUNK_SIZE = 1000
+
+# Number of words analysed in one transaction when grammemes of old words are filled
+GRAMMEMES_FILL_BATCH = 5000
+
+# Seconds thread waits for free reader slot before giving up
+READER_SLOT_TIMEOUT = 10.0
+
+
+# Trigram full-text index can't find strings shorter than trigram
+FTS_TRIGRAM_MIN_LENGTH = 3
+
+
+@functools.lru_cache(1)
+def get_fts_support() -> typing.FrozenSet[str]:
+    """
+    Returns full-text search features of SQLite library: 'fts5' if it is built with FTS5 and 'trigram'
+    if its FTS5 has trigram tokenizer (SQLite 3.34+). Databases are usable without them, search falls back to scans
+    """
+    result = set()
+    connection = sqlite3.connect(":memory:")
+    try:
+        for feature, sql in (("fts5", "create virtual table t1 using fts5(x)"),
+                             ("trigram", "create virtual table t2 using fts5(x, tokenize='trigram')")):
+            try:
+                connection.execute(sql)
+                result.add(feature)
+            except sqlite3.OperationalError:
+                pass
+    finally:
+        connection.close()
+    return frozenset(result)
+
+
+def fts_quote(text: str) -> str:
+    """Quotes text as FTS5 string, so it is matched literally and not parsed as query syntax"""
+    return '"%s"' % text.replace('"', '""')
+
+
+def like_escape(text: str) -> str:
+    """Escapes text for use in LIKE pattern with escape '\\'"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def fetch_rows(cursor: sqlite3.Cursor, chunk_size: int):
+    """Yields rows of executed query, fetching them in chunks"""
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield from rows
+
+
 def require_db(func):
     """
     Декоратор для методов API работы с базой данных - мы хотим получить корректную обработку ошибок
@@ -34,7 +107,7 @@ def require_db(func):
     def wrapper(*args, **kwargs):
         assert len(args) >= 1
         self = args[0]
-        if self.database is not None:
+        if self.connected:
             result = func(*args, **kwargs)
             return result
         logging.error("Tried to call func %s with no database open" % func.__name__)
@@ -76,6 +149,8 @@ class Word:
     word: str
     # Part of speech
     pos: int
+    # Bitmask of ling.word.GRAMMEMES
+    grammemes: int = 0
 
 
 @dataclasses.dataclass(frozen=True)
@@ -115,6 +190,212 @@ class Sentence:
     words: List[WordID]
 
 
+#
+# Connection profiles
+#
+PROFILE_INTERACTIVE = "interactive"
+PROFILE_BULK_IMPORT = "bulk-import"
+PROFILE_READ_ONLY_ANALYTICS = "read-only-analytics"
+
+
+@dataclasses.dataclass(frozen=True)
+class OpenProfile:
+    """Set of sqlite pragmas database connection is configured with"""
+    journal_mode: str = "wal"
+    # In wal mode 'normal' only syncs on checkpoints and can't corrupt database
+    synchronous: str = "normal"
+    # Page cache size, negative values are in KiB
+    cache_size: int = -16 * 1024
+    mmap_size: int = 64 * 1024 * 1024
+    temp_store: str = "memory"
+    # Number of wal pages after which checkpoint is done automatically, 0 disables automatic checkpoints
+    wal_autocheckpoint: int = 1000
+    # Whether to checkpoint and truncate wal when switching from this profile
+    checkpoint_on_leave: bool = False
+    # Disallows any changes to database
+    query_only: bool = False
+
+
+OPEN_PROFILES: Dict[str, OpenProfile] = {
+    PROFILE_INTERACTIVE: OpenProfile(),
+    # Big cache and no checkpoints while importing, wal is merged into database once import is finished
+    PROFILE_BULK_IMPORT: OpenProfile(cache_size=-256 * 1024,
+                                     mmap_size=256 * 1024 * 1024,
+                                     wal_autocheckpoint=0,
+                                     checkpoint_on_leave=True),
+    PROFILE_READ_ONLY_ANALYTICS: OpenProfile(cache_size=-64 * 1024,
+                                             mmap_size=1024 * 1024 * 1024,
+                                             query_only=True),
+}
+
+
+class ReaderConnection:
+    """
+    Read only connection owned by a single thread.
+    It takes one of reader slots of DB, which is given back when connection is closed or thread finishes
+    """
+
+    def __init__(self, filename: str, generation: int, slots: threading.BoundedSemaphore):
+        self.connection = None
+        # Slots are given back only when threads finish or close their connections, so long living threads
+        #  of pool larger than max_readers would wait forever
+        if not slots.acquire(timeout=READER_SLOT_TIMEOUT):
+            logging.error("No free reader connection slot for thread %s in %.1fs",
+                          threading.current_thread().name, READER_SLOT_TIMEOUT)
+            raise sqlite3.OperationalError("All reader connections are in use by other threads, "
+                                           "threads should call DB.close_thread_connection when done")
+        self.slots = slots
+        self.generation = generation
+        self.pid = os.getpid()
+        uri = "file:%s?mode=ro" % urllib.request.pathname2url(os.path.abspath(filename))
+        try:
+            # Connection is used only by its thread, but it can be destroyed by other thread
+            #  if its thread is killed on exit, which is checked by sqlite3 module
+            self.connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            create_functions(self.connection)
+            self.cursor = self.connection.cursor()
+            apply_profile_pragmas(self.cursor, OPEN_PROFILES[PROFILE_READ_ONLY_ANALYTICS])
+        except BaseException:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+            slots.release()
+            raise
+
+    def close(self):
+        if self.connection is not None and self.pid != os.getpid():
+            # Forked process gets copies of connections of other threads and destroys them.
+            #  SQLite connections must not be used after fork, so copy is dropped without closing it
+            self.connection = None
+            return
+        if self.connection is not None:
+            self.cursor.close()
+            self.connection.close()
+            self.connection = None
+            self.slots.release()
+
+    def __del__(self):
+        self.close()
+
+
+def create_functions(connection: sqlite3.Connection):
+    """
+    Registers functions for working with grammeme bitmasks of words in SQL, for example
+    'select id from word where has_grammemes(grammemes, 'NOUN,ablt')'. Grammemes are given as text like in
+    ling.word.grammemes_text_to_mask
+    """
+    connection.create_function("grammemes_mask", 1, ling.word.grammemes_text_to_mask, deterministic=True)
+    connection.create_function("has_grammemes", 2, has_grammemes, deterministic=True)
+    connection.create_function("grammemes_text", 1, grammemes_text, deterministic=True)
+
+
+def has_grammemes(mask: Union[int, None], grammemes: str) -> Union[bool, None]:
+    if mask is None:
+        return None
+    required = ling.word.grammemes_text_to_mask(grammemes)
+    return mask & required == required
+
+
+def grammemes_text(mask: Union[int, None]) -> Union[str, None]:
+    if mask is None:
+        return None
+    return ",".join(ling.word.mask_to_grammemes(mask))
+
+
+def apply_profile_pragmas(cursor: sqlite3.Cursor, profile: OpenProfile):
+    cursor.execute("pragma query_only = %d" % profile.query_only)
+    cursor.execute("pragma journal_mode = %s" % profile.journal_mode)
+    cursor.execute("pragma synchronous = %s" % profile.synchronous)
+    cursor.execute("pragma cache_size = %d" % profile.cache_size)
+    cursor.execute("pragma mmap_size = %d" % profile.mmap_size)
+    cursor.execute("pragma temp_store = %s" % profile.temp_store)
+    cursor.execute("pragma wal_autocheckpoint = %d" % profile.wal_autocheckpoint)
+
+
+@dataclasses.dataclass
+class CacheStats:
+    """Counters of some in-process cache"""
+    hits: int = 0
+    misses: int = 0
+    # Number of entries currently stored
+    size: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclasses.dataclass(frozen=True)
+class CorpusStats:
+    """Numbers of records of each kind in database"""
+    sgs: int
+    words: int
+    # Words which are initial forms themselves
+    initial_forms: int
+    cols: int
+    cons: int
+    sentences: int
+
+
+@dataclasses.dataclass(frozen=True)
+class WordStats:
+    """Usage counts of word, as shown in navigation tables"""
+    # Number of times word is met in sentences
+    occurrences: int = 0
+    cols: int = 0
+    cons: int = 0
+    sentences: int = 0
+
+
+@dataclasses.dataclass(frozen=True)
+class ColStats:
+    """Usage counts of collocation"""
+    occurrences: int = 0
+    cons: int = 0
+    sentences: int = 0
+
+
+@dataclasses.dataclass(frozen=True)
+class ConStats:
+    """Usage counts of connection"""
+    occurrences: int = 0
+    sentences: int = 0
+
+
+@dataclasses.dataclass(frozen=True)
+class SGStats:
+    """Usage counts of semantic group"""
+    # Number of words in all cols of group, same word is counted for each col
+    words: int = 0
+    cols: int = 0
+    cons: int = 0
+
+
+@dataclasses.dataclass(frozen=True)
+class PageCursor:
+    """Position after last record of a page. Callers should only pass it back to get next page"""
+    order_by: str
+    last_key: tuple
+
+
+@dataclasses.dataclass(frozen=True)
+class Page:
+    """Page of records returned by get_*_page methods"""
+    items: list
+    # Cursor of the next page, None if this page is the last one
+    next_cursor: Union[PageCursor, None]
+
+
+# Columns each table can be paginated by. All of them are indexed
+PAGE_ORDERS = {
+    "word": ("id", "word"),
+    "collocation": ("id", "word_hash"),
+    "conn": ("id",),
+    "sentence": ("id", "contents"),
+}
+
+
 @dataclasses.dataclass
 class DB:
     """
@@ -122,22 +403,117 @@ class DB:
     It is made a dataclass to make interface function calls always work,
     even if the database itself is not present/open
     Instead, error message is given on improper function calls
+
+    Database can be queried from multiple threads. Thread that opened database uses the only writer connection,
+    other threads get their own read only connections, up to max_readers at once.
+    Because of wal journal readers don't block writer and see last committed state
     """
     # sqlite file name
     filename: str = ""
-    database: sqlite3.Connection = None
-    cursor: sqlite3.Cursor = None
+    writer: sqlite3.Connection = None
+    writer_cursor: sqlite3.Cursor = None
+    # Id of thread which opened database and uses writer
+    writer_thread: int = None
+    max_readers: int = 4
+    # Semaphore with max_readers slots for reader connections
+    reader_slots: threading.BoundedSemaphore = None
+    # Thread local ReaderConnection
+    readers: threading.local = dataclasses.field(default_factory=threading.local)
+    # Incremented when database is reopened, so readers of previous database are not used
+    generation: int = 0
+    # Interned ids of words by their string, so repeated words don't need morphological analysis and queries.
+    # Initial forms are words too, so they are cached the same way.
+    # Filled lazily and kept coherent with word deletion
+    word_ids: Dict[str, WordID] = dataclasses.field(default_factory=dict)
+    word_ids_stats: CacheStats = dataclasses.field(default_factory=CacheStats)
+    # Ids of words (None for deleted words) found inside transaction() blocks. They are added to word_ids only when
+    #  outermost block commits, because ids of rolled back words are reused by SQLite
+    pending_word_ids: List[Tuple[str, Union[WordID, None]]] = dataclasses.field(default_factory=list)
+    # Index of all words for fuzzy search, built on first search and then updated when words are inserted and deleted
+    fuzzy_index: typing.Optional[ling.fuzzy.FuzzyIndex] = None
+    # Largest number of typos fuzzy search finds, index is built for it
+    fuzzy_max_distance: int = ling.fuzzy.DEFAULT_MAX_DISTANCE
+    # Held while index is built
+    fuzzy_index_lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+    # While index is built, words inserted (True) and deleted (False) by writer are collected here
+    #  and applied to index when it is ready
+    fuzzy_index_changes: typing.Optional[List[Tuple[str, bool]]] = None
+    fuzzy_index_changes_lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+    # Words inserted and deleted inside transaction() blocks, applied to fuzzy index when outermost block commits
+    pending_fuzzy_index_changes: List[Tuple[str, bool]] = dataclasses.field(default_factory=list)
+    # Names of full-text indexes from FTS_TABLES which exist and are kept in sync, other are searched by scans
+    fts_tables: typing.Set[str] = dataclasses.field(default_factory=set)
+    # Name of profile from OPEN_PROFILES connection is currently configured with
+    profile: str = PROFILE_INTERACTIVE
+    # Number of currently open transaction() blocks
+    transaction_depth: int = 0
+    # Incremented when database is opened and when each transaction() block is entered and left.
+    #  Caches of records compare it to know that they have to be dropped
+    write_version: int = 0
     # @TODO(hl): Backups
 
     @property
     def connected(self):
-        return self.database is not None
+        return self.writer is not None
 
-    def create_or_open(self, filename):
+    @property
+    def is_writer_thread(self) -> bool:
+        return threading.get_ident() == self.writer_thread
+
+    def get_reader_internal(self) -> ReaderConnection:
+        reader = getattr(self.readers, "connection", None)
+        if reader is None or reader.generation != self.generation:
+            if reader is not None:
+                reader.close()
+            logging.info("Opening reader connection to DB %s", self.filename)
+            reader = ReaderConnection(self.filename, self.generation, self.reader_slots)
+            self.readers.connection = reader
+        return reader
+
+    def close_thread_connection(self):
+        """Closes read only connection of current thread, so its slot can be used by other threads"""
+        reader = getattr(self.readers, "connection", None)
+        if reader is not None:
+            reader.close()
+            self.readers.connection = None
+
+    @property
+    def database(self) -> sqlite3.Connection:
+        """Connection of current thread"""
+        if self.writer is None or self.is_writer_thread:
+            return self.writer
+        return self.get_reader_internal().connection
+
+    @property
+    def cursor(self) -> sqlite3.Cursor:
+        """Cursor of current thread connection"""
+        if self.writer is None or self.is_writer_thread:
+            return self.writer_cursor
+        return self.get_reader_internal().cursor
+
+    def create_or_open(self, filename, profile: str = PROFILE_INTERACTIVE):
+        if profile not in OPEN_PROFILES:
+            logging.error("Unknown DB profile '%s', using '%s'", profile, PROFILE_INTERACTIVE)
+            profile = PROFILE_INTERACTIVE
         self.filename = filename
-        self.database = sqlite3.connect(filename)
-        self.cursor = self.database.cursor()
+        self.writer = sqlite3.connect(filename)
+        create_functions(self.writer)
+        self.writer_cursor = self.writer.cursor()
+        self.writer_thread = threading.get_ident()
+        self.reader_slots = threading.BoundedSemaphore(self.max_readers)
+        self.generation += 1
+        self.word_ids = {}
+        self.word_ids_stats = CacheStats()
+        self.pending_word_ids = []
+        self.fuzzy_index = None
+        self.fuzzy_index_changes = None
+        self.pending_fuzzy_index_changes = []
+        self.transaction_depth = 0
+        self.write_version += 1
         self.create_tables()
+        self.migrate()
+        self.create_fts_tables_internal()
+        self.check_morph_cache_internal()
         default_sgs = [
             "Предикат",
             "Объект",
@@ -150,17 +526,101 @@ class DB:
             "Угол наклона",
             "Скорость"
         ]
-        for sg_name in default_sgs:
-            self.add_sg(sg_name)
+        with self.transaction():
+            for sg_name in default_sgs:
+                self.add_sg(sg_name)
+        # Profile is applied after tables are created, because it may forbid changes
+        self.profile = PROFILE_INTERACTIVE
+        self.set_profile(profile)
 
         logging.info("Opened DB %s", filename)
 
-    def __del__(self):
-        if self.cursor is not None:
+    @require_db
+    def set_profile(self, profile: str):
+        """Configures writer connection with pragmas of profile from OPEN_PROFILES"""
+        if not self.is_writer_thread:
+            logging.error("Tried to change DB profile to '%s' not from writer thread", profile)
+            return
+        if self.transaction_depth:
+            logging.error("Tried to change DB profile to '%s' inside a transaction", profile)
+            return
+        old = OPEN_PROFILES[self.profile]
+        new = OPEN_PROFILES[profile]
+        # Pragmas can't be changed inside a transaction
+        self.database.commit()
+        if old.checkpoint_on_leave:
+            self.cursor.execute("pragma wal_checkpoint(truncate)")
+        apply_profile_pragmas(self.cursor, new)
+        self.profile = profile
+        logging.info("Using DB profile '%s'", profile)
+
+    @contextlib.contextmanager
+    def using_profile(self, profile: str):
+        """
+        Context manager switching to profile for the duration of block.
+        Read only connection is not switched, so changes still fail in it
+        """
+        old = self.profile
+        if old == profile or OPEN_PROFILES[old].query_only or self.transaction_depth or not self.is_writer_thread:
+            yield
+            return
+        self.set_profile(profile)
+        try:
+            yield
+        finally:
+            self.set_profile(old)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Context manager grouping changes in one transaction, which is committed on exit from the outermost block.
+        Blocks can be nested, each block is a savepoint which is rolled back if block raises exception.
+        Methods changing database open their own block, so they join the transaction of caller if there is one.
+        Only writer thread can change database, in other threads block does nothing
+        """
+        if not self.connected:
+            logging.error("Tried to open transaction with no database open")
+            yield
+            return
+        if not self.is_writer_thread:
+            yield
+            return
+        name = "transaction_%d" % self.transaction_depth
+        if not self.transaction_depth:
+            # Finish implicit transaction, so savepoint starts a new one
             self.database.commit()
-            self.cursor.close()
-        if self.database is not None:
-            self.database.close()
+        self.cursor.execute("savepoint %s" % name)
+        self.transaction_depth += 1
+        self.write_version += 1
+        pending_word_count = len(self.pending_word_ids)
+        pending_fuzzy_count = len(self.pending_fuzzy_index_changes)
+        try:
+            yield
+        except BaseException:
+            self.transaction_depth -= 1
+            self.cursor.execute("rollback to %s" % name)
+            self.cursor.execute("release %s" % name)
+            # Records read inside block are not valid after rollback
+            self.write_version += 1
+            del self.pending_word_ids[pending_word_count:]
+            del self.pending_fuzzy_index_changes[pending_fuzzy_count:]
+            raise
+        self.transaction_depth -= 1
+        # Releasing outermost savepoint commits transaction
+        self.cursor.execute("release %s" % name)
+        self.write_version += 1
+        if not self.transaction_depth:
+            self.update_word_ids_internal(self.pending_word_ids)
+            self.pending_word_ids = []
+            self.update_fuzzy_index_internal(self.pending_fuzzy_index_changes)
+            self.pending_fuzzy_index_changes = []
+
+    def __del__(self):
+        if self.writer_cursor is not None:
+            self.writer.commit()
+            self.writer_cursor.close()
+        if self.writer is not None:
+            self.writer.close()
 
     def execute(self, sql: str, *args):
         """
@@ -171,11 +631,11 @@ class DB:
         Additionally has convenience of no need to form tuple for arguments, because in most cases
         arguments are passed as individual elements rather than tuples
         """
-        result = list(self.cursor.execute(sql, tuple(args)))
-        if result:
-            if len(result[0]) == 1:
-                result = unwrap(result)
-        return result
+        cursor = self.cursor.execute(sql, tuple(args))
+        # Column count is known before fetching, so single column results are unwrapped without second list
+        if cursor.description is not None and len(cursor.description) == 1:
+            return [it[0] for it in cursor]
+        return cursor.fetchall()
 
     def abstract_sql_resource_get(self, query: str, id_):
         """
@@ -200,52 +660,123 @@ class DB:
         self.cursor.executescript(tables_create_query)
         self.database.commit()
 
+    @require_db
+    def get_schema_version(self) -> int:
+        sql = """select max(version) from schema_version"""
+        version = safe_unpack(self.execute(sql))
+        return version if version is not None else 0
+
+    @require_db
+    def migrate(self):
+        """
+        Brings schema of opened database to the latest version, so files created by older versions
+        of program are upgraded in place. Each migration is applied in its own transaction
+        """
+        version = self.get_schema_version()
+        for idx in range(version, len(MIGRATIONS)):
+            new_version = idx + 1
+            logging.info("Migrating DB %s to schema version %d", self.filename, new_version)
+            self.database.commit()
+            try:
+                self.cursor.executescript("begin;\n%s\ninsert into schema_version (version) values (%d);\ncommit;"
+                                          % (MIGRATIONS[idx], new_version))
+            except sqlite3.Error:
+                logging.error("Failed to migrate DB %s to schema version %d", self.filename, new_version)
+                self.database.rollback()
+                raise
+
+    def create_fts_tables_internal(self):
+        """
+        Creates full-text indexes supported by SQLite library and fills those which had no triggers.
+        Triggers of unsupported indexes are dropped, otherwise changes of indexed tables would fail
+        """
+        supported = get_fts_support()
+        triggers = set(self.execute("""select name from sqlite_master where type = 'trigger'"""))
+        self.fts_tables = set()
+        script = []
+        for name, (feature, table_sql, triggers_sql) in FTS_TABLES.items():
+            trigger_names = ["%s_on_%s" % (name, it) for it in ("insert", "delete", "update")]
+            if feature in supported:
+                script.append(table_sql)
+                script.append(triggers_sql)
+                if not all(it in triggers for it in trigger_names):
+                    logging.info("Filling full-text index %s" % name)
+                    script.append("insert into %s (%s) values ('rebuild');" % (name, name))
+                self.fts_tables.add(name)
+            else:
+                logging.warning("SQLite %s has no %s support, %s is not used" % (sqlite3.sqlite_version, feature, name))
+                script.extend("drop trigger if exists %s;" % it for it in trigger_names)
+        self.database.commit()
+        self.cursor.executescript("begin;\n%s\ncommit;" % "\n".join(script))
+
     def get_sg_internal(self, id_: Union[SemanticGroupID, None] = None) \
             -> List[SemanticGroup]:
         """Helper function for getting semantic groups"""
         sql = """select id, name from semantic_group"""
         values = self.abstract_sql_resource_get(sql, id_)
         logging.info("Queried %d semantic groups", len(values))
-        result = []
-        for id_, name in values:
-            v = SemanticGroup(id_, name)
-            result.append(v)
-        return result
+        return [self.sg_from_row(it) for it in values]
+
+    @staticmethod
+    def sg_from_row(row) -> SemanticGroup:
+        id_, name = row
+        return SemanticGroup(SemanticGroupID(id_), name)
 
     def get_word_internal(self, id_: Union[WordID, None] = None) \
             -> List[Word]:
         """Helper function for getting words"""
-        sql = "select id, initial_form_id, word, part_of_speech, has_initial_form from word"
+        sql = "select id, initial_form_id, word, part_of_speech, has_initial_form, grammemes from word"
         values = self.abstract_sql_resource_get(sql, id_)
         logging.info("Queried %d derivative forms", len(values))
-        result = []
-        for id_, init_id, form, pos, has_init in values:
-            deriv = Word(WordID(id_),
-                         WordID(init_id),
-                         form,
-                         pos)
-            result.append(deriv)
-        return result
+        return [self.word_from_row(it) for it in values]
+
+    @staticmethod
+    def word_from_row(row) -> Word:
+        id_, init_id, form, pos, has_init, grammemes = row
+        return Word(WordID(id_),
+                    WordID(init_id),
+                    form,
+                    pos,
+                    grammemes or 0)
+
+    @staticmethod
+    def cols_from_joined_rows(rows) -> typing.Iterator[Collocation]:
+        """Builds cols from rows of (id, sg_id, word_hash, words_text, word_id) ordered by col id and word index.
+           Rows of the same col are adjacent, so they are grouped in a single pass"""
+        for (id_, kind, word_hash, text), group in itertools.groupby(rows, key=lambda it: it[:4]):
+            word_ids = [WordID(it[4]) for it in group if it[4] is not None]
+            yield Collocation(CollocationID(id_),
+                              SemanticGroupID(kind),
+                              word_ids,
+                              word_hash,
+                              text)
 
     def get_cols_internal(self, id_: Union[CollocationID, None] = None) \
             -> List[Collocation]:
-        """Helper function for getting cols"""
-        sql = "select id, sg_id, word_hash, words_text from Collocation"
-        values = self.abstract_sql_resource_get(sql, id_)
-        logging.info("Queried %d cols", len(values))
-        result = []
-        for id_, kind, word_hash, text in values:
-            sql = """select word_id, idx from collocation_junction
-                     where col_id = (?)"""
-            word_ids = self.execute(sql, id_)
-            word_ids.sort(key=lambda it: it[1])
-            word_ids = [it[0] for it in word_ids]
-            coll = Collocation(CollocationID(id_),
-                               SemanticGroupID(kind),
-                               word_ids,
-                               word_hash,
-                               text)
-            result.append(coll)
+        """Helper function for getting cols
+           Words of cols are queried in the same statement with a join, instead of a query per col"""
+        sql = """select c.id, c.sg_id, c.word_hash, c.words_text, j.word_id from collocation c
+                 left join collocation_junction j on j.col_id = c.id"""
+        args = ()
+        if id_ is not None:
+            sql += " where c.id = (?)"
+            args = (id_,)
+        sql += " order by c.id, j.idx"
+        result = list(self.cols_from_joined_rows(self.cursor.execute(sql, args)))
+        logging.info("Queried %d cols", len(result))
+        return result
+
+    def get_cols_by_ids_internal(self, ids: List[CollocationID]) -> Dict[CollocationID, Collocation]:
+        """Helper function for getting multiple cols by ids with one query per SQL_MAX_VARIABLES ids"""
+        result = {}
+        for chunk in chunked(list(set(ids)), SQL_MAX_VARIABLES):
+            sql = """select c.id, c.sg_id, c.word_hash, c.words_text, j.word_id from collocation c
+                     left join collocation_junction j on j.col_id = c.id
+                     where c.id in (%s)
+                     order by c.id, j.idx""" % ", ".join("?" * len(chunk))
+            for col in self.cols_from_joined_rows(self.cursor.execute(sql, chunk)):
+                result[col.id] = col
+        logging.info("Queried %d cols by %d ids", len(result), len(ids))
         return result
 
     def get_cons_internal(self, id_: Union[ConnID, None] = None) \
@@ -254,39 +785,82 @@ class DB:
         sql = "select id, predicate, object from Conn"
         values = self.abstract_sql_resource_get(sql, id_)
         logging.info("Queried %d cons", len(values))
-        result = []
-        for id_, pred_id, obj_id in values:
-            coll = Connection(ConnID(id_),
-                              CollocationID(pred_id),
-                              CollocationID(obj_id))
-            result.append(coll)
+        return [self.con_from_row(it) for it in values]
+
+    @staticmethod
+    def con_from_row(row) -> Connection:
+        id_, pred_id, obj_id = row
+        return Connection(ConnID(id_),
+                          CollocationID(pred_id),
+                          CollocationID(obj_id))
+
+    @staticmethod
+    def merge_groups_by_id(rows, *streams):
+        """Takes rows starting with ascending id and streams of (id, value) rows ordered by id.
+           For each row yields it with list of values of every stream, so rows are consumed in a single pass"""
+        groupers = [itertools.groupby(stream, key=lambda it: it[0]) for stream in streams]
+        heads = [next(grouper, None) for grouper in groupers]
+        for row in rows:
+            id_ = row[0]
+            values = []
+            for idx, grouper in enumerate(groupers):
+                head = heads[idx]
+                # Skip junction rows that have no sentence
+                while head is not None and head[0] < id_:
+                    head = next(grouper, None)
+                if head is not None and head[0] == id_:
+                    values.append([it[1] for it in head[1]])
+                    head = next(grouper, None)
+                else:
+                    values.append([])
+                heads[idx] = head
+            yield row, values
+
+    def get_sentences_where_internal(self, cond: str, args: tuple) -> List[Sentence]:
+        """Helper function for getting sentences with id satisfying condition
+           cond is a format string for sentence id column name, empty string means all sentences.
+           All junctions are queried with one query each and merged by sentence id"""
+        result = list(self.iter_sentences_where_internal(cond, args, lambda it: it))
+        logging.info("Queried %d sentences", len(result))
         return result
 
+    def iter_sentences_where_internal(self, cond: str, args: tuple, fetch) -> typing.Iterator[Sentence]:
+        """Yields sentences with id satisfying condition, see get_sentences_where_internal.
+           fetch takes cursor with executed query and returns iterable of rows"""
+        def make_query(sql, id_column, order):
+            if cond:
+                sql += " where " + cond.format(id_column)
+            return fetch(self.database.execute(sql + " order by " + order, args))
+
+        sentences = make_query("select id, contents from sentence", "id", "id")
+        con_rows = make_query("select sent_id, con_id from sentence_connection_junction",
+                              "sent_id", "sent_id")
+        col_rows = make_query("select sent_id, col_id from sentence_collocation_junction",
+                              "sent_id", "sent_id")
+        word_rows = make_query("select sent_id, word_id from sentence_word_junction",
+                               "sent_id", "sent_id, idx")
+        for (id_, contents), (conn_ids, coll_ids, words) in self.merge_groups_by_id(sentences,
+                                                                                   con_rows, col_rows, word_rows):
+            yield Sentence(SentenceID(id_),
+                           contents,
+                           coll_ids,
+                           conn_ids,
+                           words)
+
     def get_sentences_internal(self, id_: Union[SentenceID, None] = None) \
             -> List[Sentence]:
         """Helper function for getting sentences"""
-        sql = "select id, contents from Sentence"
-        values = self.abstract_sql_resource_get(sql, id_)
-        logging.info("Queried %d sentences", len(values))
-
-        result = []
-        for id_, contents in values:
-            sql = """select con_id from Sentence_Connection_Junction
-                     where sent_id = (?)"""
-            conn_ids = self.execute(sql, id_)
-            sql = """select col_id from Sentence_Collocation_Junction
-                     where sent_id = (?)"""
-            coll_ids = self.execute(sql, id_)
-            sql = """select idx, word_id from sentence_word_junction
-                     where sent_id = (?)"""
-            words_serialized = self.execute(sql, id_)
-            words = list(flatten_by_idx(sorted(words_serialized, key=lambda it: it[0]), 1))
-            sent = Sentence(SentenceID(id_),
-                            contents,
-                            coll_ids,
-                            conn_ids,
-                            words)
-            result.append(sent)
+        if id_ is not None:
+            return self.get_sentences_where_internal("{} = (?)", (id_,))
+        return self.get_sentences_where_internal("", ())
+
+    def get_sentences_by_ids_internal(self, ids: List[SentenceID]) -> Dict[SentenceID, Sentence]:
+        """Helper function for getting multiple sentences by ids with 3 junction queries per SQL_MAX_VARIABLES ids"""
+        result = {}
+        for chunk in chunked(list(set(ids)), SQL_MAX_VARIABLES):
+            cond = "{} in (%s)" % ", ".join("?" * len(chunk))
+            for sent in self.get_sentences_where_internal(cond, tuple(chunk)):
+                result[sent.id] = sent
         return result
 
     @require_db
@@ -314,6 +888,203 @@ class DB:
         logging.info("Querying all sentences")
         return self.get_sentences_internal()
 
+    @require_db
+    def iter_sgs(self, chunk_size: int = ITER_CHUNK_SIZE) -> typing.Iterator[SemanticGroup]:
+        """Yields all semantic groups, fetching chunk_size rows at once"""
+        cursor = self.database.execute("select id, name from semantic_group")
+        return map(self.sg_from_row, fetch_rows(cursor, chunk_size))
+
+    @require_db
+    def iter_words(self, chunk_size: int = ITER_CHUNK_SIZE) -> typing.Iterator[Word]:
+        """Yields all words, fetching chunk_size rows at once"""
+        sql = "select id, initial_form_id, word, part_of_speech, has_initial_form, grammemes from word"
+        cursor = self.database.execute(sql)
+        return map(self.word_from_row, fetch_rows(cursor, chunk_size))
+
+    @require_db
+    def iter_cols(self, chunk_size: int = ITER_CHUNK_SIZE) -> typing.Iterator[Collocation]:
+        """Yields all cols, fetching chunk_size rows of cols joined with their words at once"""
+        sql = """select c.id, c.sg_id, c.word_hash, c.words_text, j.word_id from collocation c
+                 left join collocation_junction j on j.col_id = c.id
+                 order by c.id, j.idx"""
+        cursor = self.database.execute(sql)
+        return self.cols_from_joined_rows(fetch_rows(cursor, chunk_size))
+
+    @require_db
+    def iter_cons(self, chunk_size: int = ITER_CHUNK_SIZE) -> typing.Iterator[Connection]:
+        """Yields all cons, fetching chunk_size rows at once"""
+        cursor = self.database.execute("select id, predicate, object from conn")
+        return map(self.con_from_row, fetch_rows(cursor, chunk_size))
+
+    @require_db
+    def iter_sentences(self, chunk_size: int = ITER_CHUNK_SIZE) -> typing.Iterator[Sentence]:
+        """Yields all sentences, fetching chunk_size rows of sentences and each of junctions at once"""
+        return self.iter_sentences_where_internal("", (), lambda it: fetch_rows(it, chunk_size))
+
+    def get_page_rows_internal(self, table: str, columns: str, order_by: str,
+                               cursor: Union[PageCursor, None], page_size: int) -> Tuple[list, PageCursor]:
+        """
+        Helper function for keyset pagination. Returns rows of columns of page and cursor of next page.
+        Records are ordered by (order_by, id), and page starts right after key stored in cursor,
+        so no rows before page are scanned
+        """
+        # order_by is formatted into query, so it is checked even when asserts are disabled
+        if order_by not in PAGE_ORDERS[table]:
+            raise ValueError("Unknown order '%s' of %s pages, expected one of %s"
+                             % (order_by, table, ", ".join(PAGE_ORDERS[table])))
+        if cursor is not None and cursor.order_by != order_by:
+            raise ValueError("Page cursor of order '%s' used with order '%s'" % (cursor.order_by, order_by))
+        if page_size <= 0:
+            raise ValueError("Page size must be positive, got %d" % page_size)
+        key_columns = "id" if order_by == "id" else "%s, id" % order_by
+        sql = "select %s, %s from %s" % (key_columns, columns, table)
+        args = []
+        if cursor is not None:
+            sql += " where (%s) > (%s)" % (key_columns, ", ".join("?" * len(cursor.last_key)))
+            args.extend(cursor.last_key)
+        # One more row is queried to know if there is next page
+        sql += " order by %s limit ?" % key_columns
+        args.append(page_size + 1)
+        rows = self.cursor.execute(sql, args).fetchall()
+        key_len = key_columns.count(",") + 1
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = PageCursor(order_by, tuple(rows[-1][:key_len]))
+        return [it[key_len:] for it in rows], next_cursor
+
+    @require_db
+    def get_words_page(self, cursor: PageCursor = None, page_size: int = 100, order_by: str = "id") -> Page:
+        """Returns page of words ordered by 'id' or 'word', starting after cursor"""
+        rows, next_cursor = self.get_page_rows_internal("word", "id, initial_form_id, word, part_of_speech, "
+                                                                "has_initial_form, grammemes",
+                                                        order_by, cursor, page_size)
+        return Page([self.word_from_row(it) for it in rows], next_cursor)
+
+    @require_db
+    def get_cols_page(self, cursor: PageCursor = None, page_size: int = 100, order_by: str = "id") -> Page:
+        """Returns page of cols ordered by 'id' or 'word_hash', starting after cursor"""
+        rows, next_cursor = self.get_page_rows_internal("collocation", "id", order_by, cursor, page_size)
+        ids = [it[0] for it in rows]
+        cols = self.get_cols_by_ids_internal(ids)
+        return Page([cols[it] for it in ids], next_cursor)
+
+    @require_db
+    def get_cons_page(self, cursor: PageCursor = None, page_size: int = 100, order_by: str = "id") -> Page:
+        """Returns page of cons ordered by 'id', starting after cursor"""
+        rows, next_cursor = self.get_page_rows_internal("conn", "id, predicate, object", order_by, cursor, page_size)
+        return Page([self.con_from_row(it) for it in rows], next_cursor)
+
+    @require_db
+    def get_sentences_page(self, cursor: PageCursor = None, page_size: int = 100, order_by: str = "id") -> Page:
+        """Returns page of sentences ordered by 'id' or 'contents', starting after cursor"""
+        rows, next_cursor = self.get_page_rows_internal("sentence", "id", order_by, cursor, page_size)
+        ids = [it[0] for it in rows]
+        sents = self.get_sentences_by_ids_internal(ids)
+        return Page([sents[it] for it in ids], next_cursor)
+
+    @require_db
+    def get_corpus_stats(self) -> CorpusStats:
+        """Returns record counts, which are maintained by triggers, so no tables are scanned"""
+        counters = dict(self.execute("select name, value from corpus_counter"))
+        return CorpusStats(sgs=counters["semantic_group"],
+                           words=counters["word"],
+                           initial_forms=counters["initial_form"],
+                           cols=counters["collocation"],
+                           cons=counters["conn"],
+                           sentences=counters["sentence"])
+
+    @require_db
+    def get_word_stats(self, ids: List[WordID], include_forms: bool = False) -> Dict[WordID, WordStats]:
+        """
+        Returns usage counts of words, computed with grouped queries instead of query per word.
+        If include_forms is set, counts of initial forms also include all words having this initial form
+        """
+        ids = list(set(ids))
+        if include_forms:
+            key = "case when w.id in (%s) then w.id else w.initial_form_id end"
+            cond = "w.id in (%s) or w.initial_form_id in (%s)"
+        else:
+            key = "w.id"
+            cond = "w.id in (%s)"
+        sql = """select %s, count(*), count(distinct j.sent_id) from word w
+                 join sentence_word_junction j on j.word_id = w.id
+                 where %s group by 1""" % (key, cond)
+        sents = {id_: (nentr, nsents) for id_, nentr, nsents in self.select_in_internal(sql, ids)}
+        sql = """select %s, count(distinct j.col_id), count(distinct c.id) from word w
+                 join collocation_junction j on j.word_id = w.id
+                 left join conn c on c.predicate = j.col_id or c.object = j.col_id
+                 where %s group by 1""" % (key, cond)
+        cols = {id_: (ncols, ncons) for id_, ncols, ncons in self.select_in_internal(sql, ids)}
+        result = {}
+        for id_ in ids:
+            nentr, nsents = sents.get(id_, (0, 0))
+            ncols, ncons = cols.get(id_, (0, 0))
+            result[id_] = WordStats(occurrences=nentr, cols=ncols, cons=ncons, sentences=nsents)
+        return result
+
+    @require_db
+    def get_col_stats(self, ids: List[CollocationID]) -> Dict[CollocationID, ColStats]:
+        """Returns usage counts of cols"""
+        ids = list(set(ids))
+        sql = """select col_id, count(*), count(distinct sent_id) from sentence_collocation_junction
+                 where col_id in (%s) group by col_id"""
+        sents = {id_: (nentr, nsents) for id_, nentr, nsents in self.select_in_internal(sql, ids)}
+        sql = """select c.id, count(x.id) from collocation c
+                 join conn x on x.predicate = c.id or x.object = c.id
+                 where c.id in (%s) group by c.id"""
+        cons = dict(self.select_in_internal(sql, ids))
+        result = {}
+        for id_ in ids:
+            nentr, nsents = sents.get(id_, (0, 0))
+            result[id_] = ColStats(occurrences=nentr, cons=cons.get(id_, 0), sentences=nsents)
+        return result
+
+    @require_db
+    def get_con_stats(self, ids: List[ConnID]) -> Dict[ConnID, ConStats]:
+        """Returns usage counts of cons"""
+        ids = list(set(ids))
+        sql = """select con_id, count(*), count(distinct sent_id) from sentence_connection_junction
+                 where con_id in (%s) group by con_id"""
+        sents = {id_: (nentr, nsents) for id_, nentr, nsents in self.select_in_internal(sql, ids)}
+        return {id_: ConStats(*sents.get(id_, (0, 0))) for id_ in ids}
+
+    @require_db
+    def get_sg_stats(self, ids: List[SemanticGroupID]) -> Dict[SemanticGroupID, SGStats]:
+        """Returns usage counts of semantic groups"""
+        ids = list(set(ids))
+        sql = """select c.sg_id, count(j.word_id), count(distinct c.id) from collocation c
+                 left join collocation_junction j on j.col_id = c.id
+                 where c.sg_id in (%s) group by c.sg_id"""
+        cols = {id_: (nwords, ncols) for id_, nwords, ncols in self.select_in_internal(sql, ids)}
+        sql = """select c.sg_id, count(distinct x.id) from collocation c
+                 join conn x on x.predicate = c.id or x.object = c.id
+                 where c.sg_id in (%s) group by c.sg_id"""
+        cons = dict(self.select_in_internal(sql, ids))
+        result = {}
+        for id_ in ids:
+            nwords, ncols = cols.get(id_, (0, 0))
+            result[id_] = SGStats(words=nwords, cols=ncols, cons=cons.get(id_, 0))
+        return result
+
+    @require_db
+    def get_cooccurring_words(self, word_id: WordID, count: int = 10) -> List[Tuple[WordID, int]]:
+        """
+        Returns initial forms of words which are met in cols together with initial form of given word most often,
+        and number of times they are met, most frequent first. Counts are maintained by triggers, so it is fast
+        """
+        sql = """select coalesce(initial_form_id, id) from word where id = (?)"""
+        lemmas = self.execute(sql, word_id)
+        if not lemmas:
+            logging.error("Failed to query word %d" % word_id)
+            return []
+        sql = """select lemma_b, count from word_cooccurrence where lemma_a = (?)
+                 union all
+                 select lemma_a, count from word_cooccurrence where lemma_b = (?)
+                 order by 2 desc, 1
+                 limit (?)"""
+        return [(WordID(id_), n) for id_, n in self.execute(sql, lemmas[0], lemmas[0], count)]
+
     @require_db
     def get_sg(self, id_: SemanticGroupID) -> SemanticGroup:
         logging.info("Querying semantic group %d " % id_)
@@ -334,6 +1105,37 @@ class DB:
             logging.debug(result)
         return result[0] if result else None
 
+    def get_records_by_ids_internal(self, sql: str, ids: list, from_row, kind: str) -> list:
+        """Helper function for get_words, get_cons and get_sgs. sql selects record columns of rows 'where id in (%s)'"""
+        logging.info("Querying %d %ss" % (len(ids), kind))
+        records = {row[0]: from_row(row) for row in self.select_in_internal(sql, set(ids))}
+        result = []
+        for id_ in ids:
+            record = records.get(id_)
+            if record is None:
+                logging.error("Failed to query %s %d" % (kind, id_))
+            result.append(record)
+        return result
+
+    @require_db
+    def get_words(self, ids: List[WordID]) -> List[Word]:
+        """Returns words with given ids in the same order. Should be used instead of calling get_word in loops"""
+        sql = """select id, initial_form_id, word, part_of_speech, has_initial_form, grammemes from word
+                 where id in (%s)"""
+        return self.get_records_by_ids_internal(sql, ids, self.word_from_row, "word")
+
+    @require_db
+    def get_cons(self, ids: List[ConnID]) -> List[Connection]:
+        """Returns cons with given ids in the same order. Should be used instead of calling get_con in loops"""
+        sql = """select id, predicate, object from conn where id in (%s)"""
+        return self.get_records_by_ids_internal(sql, ids, self.con_from_row, "con")
+
+    @require_db
+    def get_sgs(self, ids: List[SemanticGroupID]) -> List[SemanticGroup]:
+        """Returns semantic groups with given ids in the same order"""
+        sql = """select id, name from semantic_group where id in (%s)"""
+        return self.get_records_by_ids_internal(sql, ids, self.sg_from_row, "semantic group")
+
     @require_db
     def get_col(self, id_: CollocationID) -> Collocation:
         logging.info("Querying col %d" % id_)
@@ -344,6 +1146,19 @@ class DB:
             logging.debug(result)
         return result[0] if result else None
 
+    @require_db
+    def get_cols(self, ids: List[CollocationID]) -> List[Collocation]:
+        """Returns cols with given ids in the same order. Should be used instead of calling get_col in loops"""
+        logging.info("Querying %d cols" % len(ids))
+        cols = self.get_cols_by_ids_internal(ids)
+        result = []
+        for id_ in ids:
+            col = cols.get(id_)
+            if col is None:
+                logging.error("Failed to query col %d" % id_)
+            result.append(col)
+        return result
+
     @require_db
     def get_con(self, id_: ConnID) -> Connection:
         logging.info("Querying con %d" % id_)
@@ -364,6 +1179,19 @@ class DB:
             logging.debug(result)
         return result[0] if result else None
 
+    @require_db
+    def get_sentences(self, ids: List[SentenceID]) -> List[Sentence]:
+        """Returns sentences with given ids in the same order. Should be used instead of calling get_sentence in loops"""
+        logging.info("Querying %d sentences" % len(ids))
+        sents = self.get_sentences_by_ids_internal(ids)
+        result = []
+        for id_ in ids:
+            sent = sents.get(id_)
+            if sent is None:
+                logging.error("Failed to query sentence %d" % id_)
+            result.append(sent)
+        return result
+
     @require_db
     def get_word_id_by_word(self, word: str) -> WordID:
         """Returns word id by its string"""
@@ -409,6 +1237,85 @@ class DB:
         result = self.execute(sql, id_)
         return result
 
+    @require_db
+    def get_initial_form_word_ids(self) -> List[WordID]:
+        """Returns sorted ids of words which don't have initial form, so they are initial forms themselves"""
+        sql = """select id from word where initial_form_id is null order by id"""
+        return self.execute(sql)
+
+    @require_db
+    def get_word_ids_by_grammemes(self, grammemes: str, sg_id: SemanticGroupID = None) -> List[WordID]:
+        """
+        Returns sorted ids of words having all grammemes, given as text like 'NOUN,ablt'.
+        If sg_id is given, only words of cols of this semantic group are returned.
+        Words which were added before grammemes were stored are analysed first if database can be changed,
+        otherwise their grammemes are unknown and they are not returned
+        """
+        try:
+            mask = ling.word.grammemes_text_to_mask(grammemes)
+        except ValueError as e:
+            logging.error("Invalid grammemes filter '%s': %s" % (grammemes, e))
+            return []
+        if sg_id is None:
+            unknown_ids = self.execute("""select id from word where grammemes is null""")
+        else:
+            sql = """select distinct w.id from collocation c
+                     join collocation_junction j on j.col_id = c.id
+                     join word w on w.id = j.word_id
+                     where c.sg_id = (?) and w.grammemes is null"""
+            unknown_ids = self.execute(sql, sg_id)
+        if not self.fill_word_grammemes_internal(unknown_ids):
+            logging.info("Grammemes of %d words are unknown, they are not matched by filter" % len(unknown_ids))
+        if sg_id is None:
+            # Bit test can't be searched in index, but word_grammemes_idx is covering,
+            # so it is scanned instead of table
+            sql = """select id from word where grammemes & (?) = (?) order by id"""
+            return self.execute(sql, mask, mask)
+        sql = """select distinct w.id from collocation c
+                 join collocation_junction j on j.col_id = c.id
+                 join word w on w.id = j.word_id
+                 where c.sg_id = (?) and w.grammemes & (?) = (?)
+                 order by w.id"""
+        return self.execute(sql, sg_id, mask, mask)
+
+    @require_db
+    def get_word_ids_with_initial_forms(self, ids: List[WordID]) -> List[WordID]:
+        """Returns sorted ids of words having any of given initial forms, not including initial forms"""
+        sql = """select id from word where initial_form_id in (%s)"""
+        return sorted(unwrap(self.select_in_internal(sql, set(ids))))
+
+    @require_db
+    def get_col_ids_with_word_ids(self, ids: List[WordID]) -> List[CollocationID]:
+        """Returns sorted ids of all cols containing any of words"""
+        sql = """select distinct col_id from collocation_junction where word_id in (%s)"""
+        return sorted(set(unwrap(self.select_in_internal(sql, set(ids)))))
+
+    @require_db
+    def get_con_ids_with_col_ids(self, ids: List[CollocationID]) -> List[ConnID]:
+        """Returns sorted ids of all cons having any of cols as predicate or object"""
+        sql = """select id from conn where predicate in (%s) or object in (%s)"""
+        return sorted(set(unwrap(self.select_in_internal(sql, set(ids)))))
+
+    @require_db
+    def get_sentence_ids_with_word_ids(self, ids: List[WordID]) -> List[SentenceID]:
+        """Returns sorted ids of all sentences with any of words"""
+        sql = """select distinct sent_id from sentence_word_junction where word_id in (%s)"""
+        return sorted(set(unwrap(self.select_in_internal(sql, set(ids)))))
+
+    @require_db
+    def get_col_ids_of_sgs(self, ids: List[SemanticGroupID]) -> List[CollocationID]:
+        """Returns sorted ids of all cols having any of semantic groups"""
+        sql = """select id from collocation where sg_id in (%s)"""
+        return sorted(set(unwrap(self.select_in_internal(sql, set(ids)))))
+
+    @require_db
+    def get_word_ids_of_sgs(self, ids: List[SemanticGroupID]) -> List[WordID]:
+        """Returns sorted ids of all words in cols having any of semantic groups"""
+        sql = """select distinct j.word_id from collocation c
+                 join collocation_junction j on j.col_id = c.id
+                 where c.sg_id in (%s)"""
+        return sorted(set(unwrap(self.select_in_internal(sql, set(ids)))))
+
     @require_db
     def get_sg_id_by_name(self, name: str) -> SemanticGroupID:
         """Returns semantic group id by name"""
@@ -420,11 +1327,166 @@ class DB:
         return result
 
     @require_db
-    def get_word_ids_by_word_part(self, word: str) -> List[SentenceID]:
-        """Returns sentences where word is met in text"""
-        sql = """select id from word where word LIKE '%' || ? || '%' """
-        sentences = self.execute(sql, word)
-        return sentences
+    def get_word_ids_by_word_part(self, word: str) -> List[WordID]:
+        """Returns words containing given part"""
+        return self.search_words_by_substring(word)
+
+    def search_by_substring_internal(self, table: str, fts_table: str, column: str, part: str) -> list:
+        """Helper function for substring search using trigram index, or scan if index can't be used"""
+        if not part:
+            return []
+        if len(part) < FTS_TRIGRAM_MIN_LENGTH or fts_table not in self.fts_tables:
+            # Trigram index can't match strings shorter than 3 characters and is missing if SQLite doesn't
+            # support it, so table is scanned
+            sql = """select id from %s where %s like (?) escape '\\' order by id""" % (table, column)
+            return self.execute(sql, "%" + like_escape(part) + "%")
+        sql = """select rowid from %s where %s match (?) order by rowid""" % (fts_table, fts_table)
+        return self.execute(sql, fts_quote(part))
+
+    @require_db
+    def search_words_by_substring(self, part: str) -> List[WordID]:
+        """Returns ids of words containing part"""
+        return self.search_by_substring_internal("word", "word_trigram_fts", "word", part.lower())
+
+    def search_words_by_prefix_internal(self, columns: str, prefix: str, limit: Union[int, None]) -> list:
+        """Helper function for prefix search of words in alphabetical order"""
+        if not prefix:
+            return []
+        # Words are unique, so their index can be used for range search.
+        # With limit only first rows of range are read, so it is fast even for single letter
+        sql = """select %s from word where word >= (?) and word < (?) order by word limit (?)""" % columns
+        prefix = prefix.lower()
+        return self.execute(sql, prefix, prefix + chr(0x10ffff), -1 if limit is None else limit)
+
+    @require_db
+    def search_words_by_prefix(self, prefix: str, limit: int = None) -> List[WordID]:
+        """Returns ids of words starting with prefix, at most limit of them if it is given"""
+        return self.search_words_by_prefix_internal("id", prefix, limit)
+
+    def get_fuzzy_index_internal(self) -> ling.fuzzy.FuzzyIndex:
+        """Returns fuzzy index of words, building it if this is the first search"""
+        with self.fuzzy_index_lock:
+            if self.fuzzy_index is None:
+                generation = self.generation
+                with self.fuzzy_index_changes_lock:
+                    self.fuzzy_index_changes = []
+                start_time = time.perf_counter()
+                index = ling.fuzzy.FuzzyIndex(self.fuzzy_max_distance)
+                for word in self.iter_words():
+                    index.add(word.word)
+                with self.fuzzy_index_changes_lock:
+                    # Changes are reset if database is reopened meanwhile
+                    self.update_fuzzy_index_internal(self.fuzzy_index_changes or [], index)
+                    self.fuzzy_index_changes = None
+                    if generation != self.generation:
+                        # Database was reopened while index was built
+                        return index
+                    self.fuzzy_index = index
+                logging.info("Built fuzzy index of %d words in %.3fs",
+                             len(index), time.perf_counter() - start_time)
+            return self.fuzzy_index
+
+    def add_fuzzy_index_changes_internal(self, changes: List[Tuple[str, bool]]):
+        """Applies inserted (True) and deleted (False) words to fuzzy index, inside transaction() when it commits"""
+        if self.transaction_depth:
+            self.pending_fuzzy_index_changes.extend(changes)
+        else:
+            self.update_fuzzy_index_internal(changes)
+
+    def update_fuzzy_index_internal(self, changes: List[Tuple[str, bool]], index: ling.fuzzy.FuzzyIndex = None):
+        """Applies inserted (True) and deleted (False) words to fuzzy index, if it is built or is being built"""
+        if index is None:
+            with self.fuzzy_index_changes_lock:
+                if self.fuzzy_index_changes is not None:
+                    self.fuzzy_index_changes.extend(changes)
+                    return
+                index = self.fuzzy_index
+            if index is None:
+                return
+        for word, inserted in changes:
+            if inserted:
+                index.add(word)
+            else:
+                index.remove(word)
+
+    def set_fuzzy_max_distance(self, max_distance: int):
+        """
+        Sets largest number of typos fuzzy search finds. Index is rebuilt on next search if distance is changed,
+        and larger distances make it much larger
+        """
+        with self.fuzzy_index_lock:
+            if max_distance != self.fuzzy_max_distance:
+                self.fuzzy_max_distance = max_distance
+                self.fuzzy_index = None
+
+    @require_db
+    def start_fuzzy_index_build(self):
+        """
+        Builds fuzzy index in background thread, so first fuzzy search doesn't have to wait for it.
+        Otherwise index is built by first search
+        """
+        def build():
+            try:
+                self.get_fuzzy_index_internal()
+            finally:
+                self.close_thread_connection()
+        threading.Thread(target=build, name="fuzzy-index", daemon=True).start()
+
+    @require_db
+    def search_words_fuzzy(self, word: str, max_distance: int = 1) -> List[Tuple[WordID, int]]:
+        """
+        Returns ids of words which differ from word by at most max_distance typos, and number of typos in them.
+        Closest words go first. 'ё' and 'е' are considered the same letter
+        """
+        if max_distance > self.fuzzy_max_distance:
+            logging.warning("Fuzzy search distance %d is limited to %d, see set_fuzzy_max_distance",
+                            max_distance, self.fuzzy_max_distance)
+        if not word:
+            return []
+        found = self.get_fuzzy_index_internal().lookup(word, max_distance)
+        # Index is updated when transaction commits, so words deleted by open transaction are still in it
+        sql = """select word, id from word where word in (%s)"""
+        ids = dict(self.select_in_internal(sql, [it for it, _ in found]))
+        return [(WordID(ids[it]), distance) for it, distance in found if it in ids]
+
+    @require_db
+    def get_word_completions(self, prefix: str, limit: int = 10) -> List[str]:
+        """Returns first words starting with prefix in alphabetical order, used for search-as-you-type"""
+        return self.search_words_by_prefix_internal("word", prefix, limit)
+
+    @require_db
+    def search_sentences_by_substring(self, part: str) -> List[SentenceID]:
+        """
+        Returns ids of sentences containing part in text.
+        Case is ignored if part is not too short and SQLite supports trigram index
+        """
+        return self.search_by_substring_internal("sentence", "sentence_trigram_fts", "contents", part)
+
+    @require_db
+    def search_sentences_by_phrase(self, phrase: str) -> List[SentenceID]:
+        """Returns ids of sentences containing words of phrase in the same order one after another"""
+        if not phrase.strip():
+            return []
+        if "sentence_fts" not in self.fts_tables:
+            # Without index phrase is searched as is, so punctuation and spaces between words have to match
+            sql = """select id from sentence where contents like (?) escape '\\' order by id"""
+            return self.execute(sql, "%" + like_escape(" ".join(phrase.split())) + "%")
+        sql = """select rowid from sentence_fts where sentence_fts match (?) order by rowid"""
+        return self.execute(sql, fts_quote(phrase))
+
+    @require_db
+    def search_sentences_by_prefix(self, prefix: str) -> List[SentenceID]:
+        """Returns ids of sentences containing word starting with prefix"""
+        if not prefix.strip():
+            return []
+        if "sentence_fts" not in self.fts_tables:
+            # Without index word start is found only at start of sentence or after space
+            sql = """select id from sentence where contents like (?) escape '\\' or contents like (?) escape '\\'
+                     order by id"""
+            pattern = like_escape(prefix.strip()) + "%"
+            return self.execute(sql, pattern, "% " + pattern)
+        sql = """select rowid from sentence_fts where sentence_fts match (?) order by rowid"""
+        return self.execute(sql, fts_quote(prefix) + " *")
 
     @require_db
     def get_cols_of_sg(self, sg: SemanticGroupID) -> List[CollocationID]:
@@ -436,148 +1498,466 @@ class DB:
 
     @require_db
     def delete_sentence(self, sent_id: SentenceID):
-        sql = """delete from sentence where id = (?)"""
-        self.execute(sql, sent_id)
-
-        sql = """delete from Sentence_Collocation_Junction where sent_id = (?)"""
-        self.execute(sql, sent_id)
-
-        sql = """delete from Sentence_Connection_Junction where sent_id = (?)"""
-        self.execute(sql, sent_id)
-        sql = """delete from sentence_word_junction where sent_id = (?)"""
-        self.execute(sql, sent_id)
+        self.delete_sentences([sent_id])
 
-        sql = """delete from collocation where id not in (
-            select col_id from sentence_collocation_junction
-        )"""
-        self.execute(sql)
-        sql = """delete from conn where id not in (
-            select con_id from sentence_connection_junction
+    @require_db
+    def delete_sentences(self, sent_ids: List[SentenceID]):
+        """
+        Deletes sentences, and cols, cons and words which are not used anymore.
+        Only records referenced by deleted sentences are checked, so cost doesn't depend on database size
+        """
+        sent_ids = list(set(sent_ids))
+        with self.transaction():
+            sql = """select distinct col_id from Sentence_Collocation_Junction where sent_id in (%s)"""
+            col_ids = unwrap(self.select_in_internal(sql, sent_ids))
+            sql = """select distinct con_id from Sentence_Connection_Junction where sent_id in (%s)"""
+            con_ids = unwrap(self.select_in_internal(sql, sent_ids))
+            sql = """select distinct word_id from sentence_word_junction where sent_id in (%s)"""
+            word_ids = unwrap(self.select_in_internal(sql, sent_ids))
+
+            sent_id_args = [(it,) for it in sent_ids]
+            sql = """delete from sentence where id = (?)"""
+            self.cursor.executemany(sql, sent_id_args)
+            sql = """delete from Sentence_Collocation_Junction where sent_id = (?)"""
+            self.cursor.executemany(sql, sent_id_args)
+            sql = """delete from Sentence_Connection_Junction where sent_id = (?)"""
+            self.cursor.executemany(sql, sent_id_args)
+            sql = """delete from sentence_word_junction where sent_id = (?)"""
+            self.cursor.executemany(sql, sent_id_args)
+
+            ncols, ncons, nwords = self.delete_unused_internal(col_ids, con_ids, word_ids)
+
+        logging.info("Deleted %d sentences, %d cols, %d cons, %d words",
+                     len(sent_ids), ncols, ncons, nwords)
+
+    def delete_unused_internal(self, col_ids: Iterable[CollocationID], con_ids: Iterable[ConnID],
+                               word_ids: Iterable[WordID]) -> Tuple[int, int, int]:
+        """
+        Deletes given cols, cons and words if they are not referenced anymore.
+        Words of deleted cols and initial forms of deleted words are checked too.
+        Returns number of deleted cols, cons and words
+        """
+        word_ids = set(word_ids)
+        sql = """select id from conn where id in (%s) and not exists (
+            select 1 from sentence_connection_junction where con_id = conn.id
         )"""
-        self.execute(sql)
-        sql = """delete from word where id not in (
-            select word_id from sentence_word_junction
-        ) and id not in (
-            select initial_form_id from word 
+        dead_con_ids = unwrap(self.select_in_internal(sql, set(con_ids)))
+        sql = """delete from conn where id = (?)"""
+        self.cursor.executemany(sql, [(it,) for it in dead_con_ids])
+
+        sql = """select id from collocation where id in (%s) and not exists (
+            select 1 from sentence_collocation_junction where col_id = collocation.id
+        ) and not exists (
+            select 1 from conn where predicate = collocation.id or object = collocation.id
         )"""
-        self.execute(sql)
-        self.database.commit()
+        dead_col_ids = unwrap(self.select_in_internal(sql, set(col_ids)))
+        sql = """select distinct word_id from collocation_junction where col_id in (%s)"""
+        word_ids.update(unwrap(self.select_in_internal(sql, dead_col_ids)))
+        dead_col_id_args = [(it,) for it in dead_col_ids]
+        sql = """delete from collocation_junction where col_id = (?)"""
+        self.cursor.executemany(sql, dead_col_id_args)
+        sql = """delete from collocation where id = (?)"""
+        self.cursor.executemany(sql, dead_col_id_args)
+
+        # Initial forms of deleted words may become unused, so they are checked after words referencing them
+        dead_word_count = 0
+        while word_ids:
+            sql = """select id, word, initial_form_id from word where id in (%s) and not exists (
+                select 1 from sentence_word_junction where word_id = word.id
+            ) and not exists (
+                select 1 from collocation_junction where word_id = word.id
+            ) and not exists (
+                select 1 from word w where w.initial_form_id = word.id
+            )"""
+            dead_words = self.select_in_internal(sql, word_ids)
+            sql = """delete from word where id = (?)"""
+            self.cursor.executemany(sql, [(id_,) for id_, _, _ in dead_words])
+            self.set_word_ids_internal([(word, None) for _, word, _ in dead_words])
+            self.add_fuzzy_index_changes_internal([(word, False) for _, word, _ in dead_words])
+            dead_word_count += len(dead_words)
+            word_ids = {init_id for _, _, init_id in dead_words if init_id is not None}
+        return len(dead_col_ids), len(dead_con_ids), dead_word_count
+
+    def select_in_internal(self, sql: str, values) -> list:
+        """
+        Executes query containing 'in (%s)' for values, split in chunks of SQL_MAX_VARIABLES.
+        Returns list of all result rows
+        """
+        # Same chunk is passed to each 'in (%s)' if there are several of them
+        count = sql.count("%s")
+        result = []
+        for chunk in chunked(list(values), SQL_MAX_VARIABLES):
+            placeholders = ", ".join("?" * len(chunk))
+            result.extend(self.cursor.execute(sql % ((placeholders,) * count), chunk * count))
+        return result
 
-    @require_db
-    def add_or_update_sentence_record(self, sent: "sentence.Sentence"):
-        """Inserts sentence into database"""
-        logging.info("Updating sentence %s (wc %d)", sent.text, len(sent.words))
+    def get_or_insert_cols_internal(self, cols: Dict[str, Tuple[SemanticGroupID, List[WordID]]]) \
+            -> Dict[str, CollocationID]:
+        """
+        Takes semantic groups and word ids of cols by their word hashes.
+        Returns ids of cols by word hashes, inserting missing cols
+        """
+        # @HACK(hl): Because it is complicated and slow to do checks for all junctions, we use word hash here
+        #  This way we can directly compare it
+        sql = """select word_hash, min(id) from collocation where word_hash in (%s) group by word_hash"""
+        col_ids = dict(self.select_in_internal(sql, cols.keys()))
+        new_col_hashes = [it for it in cols if it not in col_ids]
+        if new_col_hashes:
+            logging.info("Inserting %d cols" % len(new_col_hashes))
+            # @TODO(hl): Proper words_text
+            sql = """insert into collocation (sg_id, word_hash, words_text) values (?, ?, ?)"""
+            self.cursor.executemany(sql, [(cols[it][0], it, it) for it in new_col_hashes])
+            sql = """select word_hash, id from collocation where word_hash in (%s)"""
+            col_ids.update(self.select_in_internal(sql, new_col_hashes))
+            sql = """insert into collocation_junction (word_id, col_id, idx)
+                     values (?, ?, ?)"""
+            self.cursor.executemany(sql, [(word_id, col_ids[it], idx)
+                                          for it in new_col_hashes
+                                          for idx, word_id in enumerate(cols[it][1])])
+        return col_ids
+
+    def get_or_insert_cons_internal(self, pairs: List[Tuple[CollocationID, CollocationID]]) \
+            -> Dict[Tuple[CollocationID, CollocationID], ConnID]:
+        """Returns ids of cons by (predicate, object) pairs, inserting missing cons"""
+        sql = """insert or ignore into Conn (predicate, object)
+                 values(?, ?)"""
+        self.cursor.executemany(sql, pairs)
+        # Pairs are looked up by joining with a temporary table, because they can't be passed as 'in' list
+        self.cursor.execute("""create temp table if not exists conn_pairs (
+                                   predicate integer not null,
+                                   object integer not null
+                               )""")
+        self.cursor.execute("""delete from conn_pairs""")
+        self.cursor.executemany("""insert into conn_pairs (predicate, object) values (?, ?)""", pairs)
+        sql = """select p.predicate, p.object, c.id from conn_pairs p
+                 join conn c on c.predicate = p.predicate and c.object = p.object"""
+        return {(pred, obj): id_ for pred, obj, id_ in self.cursor.execute(sql)}
+
+    @staticmethod
+    def get_col_hash(sent: "sentence.Sentence", col: "sentence.Collocation") -> str:
+        return " ".join(sent.words[it] for it in col.word_idxs).lower()
+
+    def add_sentence_records_batch_internal(self, batch: List["sentence.Sentence"]) -> List[SentenceID]:
+        """Inserts batch of sentences, resolving all words, cols and cons of batch with bulk queries"""
         #
-        # add sentence record
+        # add sentence records
         #
+        # If sentence is met several times in batch, last record is used, like with sequential updates
+        sents = {sent.text: sent for sent in batch}
         sql = "insert or ignore into Sentence (contents) values (?)"
-        self.execute(sql, sent.text)
-
-        sql = "select id from Sentence where contents = (?)"
-        sentence_id = safe_unpack(self.execute(sql, sent.text))
+        self.cursor.executemany(sql, [(text,) for text in sents])
+        sql = "select contents, id from Sentence where contents in (%s)"
+        sent_ids = dict(self.select_in_internal(sql, sents.keys()))
 
         #
-        # first of all, delete all previous entries about sentence
+        # first of all, delete all previous entries about sentences
         #
+        # Cols, cons and words of previous entries are deleted at the end if they are not used anymore
+        sql = """select col_id from sentence_collocation_junction where sent_id in (%s)"""
+        old_col_ids = unwrap(self.select_in_internal(sql, sent_ids.values()))
+        sql = """select con_id from sentence_connection_junction where sent_id in (%s)"""
+        old_con_ids = unwrap(self.select_in_internal(sql, sent_ids.values()))
+        sql = """select word_id from sentence_word_junction where sent_id in (%s)"""
+        old_word_ids = unwrap(self.select_in_internal(sql, sent_ids.values()))
+        sent_id_args = [(sent_ids[text],) for text in sents]
         sql = """delete from Sentence_Collocation_Junction where sent_id = (?)"""
-        self.execute(sql, sentence_id)
-
+        self.cursor.executemany(sql, sent_id_args)
         sql = """delete from Sentence_Connection_Junction where sent_id = (?)"""
-        self.execute(sql, sentence_id)
+        self.cursor.executemany(sql, sent_id_args)
         sql = """delete from sentence_word_junction where sent_id = (?)"""
-        self.execute(sql, sentence_id)
+        self.cursor.executemany(sql, sent_id_args)
 
         #
         # now start populating database again
         #
-        logging.info("Inserting %d words" % len(sent.words))
-        word_ids = []
-        for idx, (word, start_idx) in enumerate(zip(sent.words, sent.word_starts)):
-            word_id = self.get_or_insert_word(word)
-            junction_data = (sentence_id, word_id, idx, start_idx)
+        word_ids = self.get_or_insert_words(word for sent in sents.values() for word in sent.words)
+        sql = """insert into sentence_word_junction (sent_id, word_id, idx, text_idx)
+                 values (?, ?, ?, ?)"""
+        self.cursor.executemany(sql, [(sent_ids[text], word_ids[word], idx, start_idx)
+                                      for text, sent in sents.items()
+                                      for idx, (word, start_idx) in enumerate(zip(sent.words, sent.word_starts))])
+
+        col_hashes = {}
+        sent_col_hashes = {}
+        for text, sent in sents.items():
+            hashes = []
+            for col in sent.cols:
+                word_hash = self.get_col_hash(sent, col)
+                col_hashes.setdefault(word_hash, (col.sg, [word_ids[sent.words[it]] for it in col.word_idxs]))
+                hashes.append(word_hash)
+            sent_col_hashes[text] = hashes
+        col_ids = self.get_or_insert_cols_internal(col_hashes)
+        sql = """insert or ignore into Sentence_Collocation_Junction (sent_id, col_id)
+                 values (?, ?)"""
+        self.cursor.executemany(sql, [(sent_ids[text], col_ids[it])
+                                      for text, hashes in sent_col_hashes.items()
+                                      for it in hashes])
+
+        sent_con_pairs = {}
+        for text, sent in sents.items():
+            hashes = sent_col_hashes[text]
+            sent_con_pairs[text] = [(col_ids[hashes[con.predicate_idx]], col_ids[hashes[con.actant_idx]])
+                                    for con in sent.cons]
+        con_ids = self.get_or_insert_cons_internal(list(dict.fromkeys(pair
+                                                                      for pairs in sent_con_pairs.values()
+                                                                      for pair in pairs)))
+        sql = """insert or ignore into Sentence_Connection_Junction (sent_id, con_id)
+                 values(?, ?)"""
+        self.cursor.executemany(sql, [(sent_ids[text], con_ids[pair])
+                                      for text, pairs in sent_con_pairs.items()
+                                      for pair in pairs])
+
+        if old_col_ids or old_con_ids or old_word_ids:
+            self.delete_unused_internal(old_col_ids, old_con_ids, old_word_ids)
+        return [SentenceID(sent_ids[sent.text]) for sent in batch]
+
+    def update_sentence_record_internal(self, sent: "sentence.Sentence") -> SentenceID:
+        """
+        Updates stored sentence to match sent, changing only junction rows that differ.
+        Words are only processed if stored ones don't match sentence text
+        """
+        sql = "select id from Sentence where contents = (?)"
+        sentence_id = self.execute(sql, sent.text)
+        if not sentence_id:
+            return safe_unpack(self.add_sentence_records_batch_internal([sent]))
+        sentence_id = sentence_id[0]
+
+        sql = """select word_id from sentence_word_junction where sent_id = (?) order by idx"""
+        word_ids = self.execute(sql, sentence_id)
+        if len(word_ids) != len(sent.words):
+            logging.info("Rewriting %d words of sentence %d" % (len(sent.words), sentence_id))
+            sql = """delete from sentence_word_junction where sent_id = (?)"""
+            self.execute(sql, sentence_id)
+            word_id_map = self.get_or_insert_words(sent.words)
+            word_ids = [word_id_map[it] for it in sent.words]
             sql = """insert into sentence_word_junction (sent_id, word_id, idx, text_idx)
                      values (?, ?, ?, ?)"""
-            self.execute(sql, *junction_data)
-            word_ids.append(word_id)
-
-        logging.info("Inserting %d cols" % len(sent.cols))
-
-        col_ids = []
-        for idx, col in enumerate(sent.cols):
-            col_words = list(map(lambda it: sent.words[it], col.word_idxs))
-            word_hash = " ".join(col_words)
-            word_hash = word_hash.lower()
-            # First of all, try to find col with same words
-            # @HACK(hl): Because it is complicated and slow to do checks for all junctions, we use word hash here
-            #  This way we can directly compare it
-            sql = """select id from collocation where word_hash = (?)"""
-            col_id = self.execute(sql, word_hash)
-            if not col_id:
-                logging.info("Inserting col %d %s" % (col.sg, str(col_words)))
-                sql = """insert into collocation (sg_id, word_hash, words_text) values (?, ?, ?)"""
-                # @TODO(hl): Proper words_text
-                self.execute(sql, col.sg, word_hash, word_hash)
-                sql = """select id from collocation
-                         where rowid = ( select last_insert_rowid() )"""
-                col_id = safe_unpack(self.execute(sql))
-
-                sql = """insert into collocation_junction (word_id, col_id, idx)
-                         values (?, ?, ?)
-                         """
-                words = list(map(lambda it: (word_ids[it[1]], col_id, it[0]), enumerate(col.word_idxs)))
-                self.cursor.executemany(sql, words)
+            self.cursor.executemany(sql, [(sentence_id, word_id, idx, start_idx)
+                                          for idx, (word_id, start_idx) in enumerate(zip(word_ids, sent.word_starts))])
+
+        hashes = [self.get_col_hash(sent, col) for col in sent.cols]
+        col_ids = self.get_or_insert_cols_internal({
+            word_hash: (col.sg, [word_ids[it] for it in col.word_idxs])
+            for word_hash, col in zip(hashes, sent.cols)
+        })
+        sql = """select col_id from Sentence_Collocation_Junction where sent_id = (?)"""
+        old_col_ids = set(self.execute(sql, sentence_id))
+        new_col_ids = {col_ids[it] for it in hashes}
+        removed_col_ids = old_col_ids - new_col_ids
+        sql = """delete from Sentence_Collocation_Junction where sent_id = (?) and col_id = (?)"""
+        self.cursor.executemany(sql, [(sentence_id, it) for it in removed_col_ids])
+        sql = """insert into Sentence_Collocation_Junction (sent_id, col_id)
+                 values (?, ?)"""
+        self.cursor.executemany(sql, [(sentence_id, it) for it in new_col_ids - old_col_ids])
+
+        pairs = [(col_ids[hashes[con.predicate_idx]], col_ids[hashes[con.actant_idx]]) for con in sent.cons]
+        con_ids = self.get_or_insert_cons_internal(pairs)
+        sql = """select con_id from Sentence_Connection_Junction where sent_id = (?)"""
+        old_con_ids = set(self.execute(sql, sentence_id))
+        new_con_ids = set(con_ids.values())
+        removed_con_ids = old_con_ids - new_con_ids
+        sql = """delete from Sentence_Connection_Junction where sent_id = (?) and con_id = (?)"""
+        self.cursor.executemany(sql, [(sentence_id, it) for it in removed_con_ids])
+        sql = """insert into Sentence_Connection_Junction (sent_id, con_id)
+                 values (?, ?)"""
+        self.cursor.executemany(sql, [(sentence_id, it) for it in new_con_ids - old_con_ids])
+
+        logging.info("Sentence %d: %d cols added, %d removed, %d cons added, %d removed",
+                     sentence_id, len(new_col_ids - old_col_ids), len(removed_col_ids),
+                     len(new_con_ids - old_con_ids), len(removed_con_ids))
+        # Cols and cons dropped from sentence may be not used anymore
+        self.delete_unused_internal(removed_col_ids, removed_con_ids, ())
+        return SentenceID(sentence_id)
+
+    @require_db
+    def add_sentence_records(self, sents: Iterable["sentence.Sentence"],
+                             batch_size: int = 1000) -> List[SentenceID]:
+        """
+        Inserts or updates sentences in database. Returns ids of sentences in the same order.
+        Sentences are processed in batches of batch_size, each batch is committed once.
+        Connection uses bulk import profile while sentences are inserted
+        """
+        with self.using_profile(PROFILE_BULK_IMPORT):
+            return self.add_sentence_records_internal(sents, batch_size)
+
+    def add_sentence_records_internal(self, sents: Iterable["sentence.Sentence"],
+                                      batch_size: int) -> List[SentenceID]:
+        start_time = time.perf_counter()
+        result = []
+        sents = iter(sents)
+        while True:
+            batch = list(itertools.islice(sents, batch_size))
+            if not batch:
+                break
+            with self.transaction():
+                result.extend(self.add_sentence_records_batch_internal(batch))
+        elapsed = time.perf_counter() - start_time
+        logging.info("Inserted %d sentences in %.3fs (%.1f sentences/s)",
+                     len(result), elapsed, len(result) / elapsed if elapsed else 0.0)
+        return result
+
+    @require_db
+    def add_or_update_sentence_record(self, sent: "sentence.Sentence") -> SentenceID:
+        """Inserts sentence into database or applies changes to stored one"""
+        logging.info("Updating sentence %s (wc %d)", sent.text, len(sent.words))
+        with self.transaction():
+            return self.update_sentence_record_internal(sent)
+
+    def analyse_words_internal(self, word_strs: List[str]) -> Dict[str, ling.word.Word]:
+        """
+        Returns analysis of distinct words by their strings. Results are taken from morph_cache table,
+        and only words missing there are analysed and added to it
+        """
+        sql = """select word, initial_form, part_of_speech, grammemes from morph_cache where word in (%s)"""
+        result = {it[0]: ling.word.Word(*it) for it in self.select_in_internal(sql, word_strs)}
+        misses = [it for it in word_strs if it not in result]
+        if misses:
+            logging.info("Analysing %d words, %d found in morph cache" % (len(misses), len(result)))
+            for word_str, word in zip(misses, ling.word.analyse_words(misses)):
+                if word is None:
+                    word = ling.word.Word(word_str, None, ling.word.POS_NONE)
+                result[word_str] = word
+            sql = """insert or replace into morph_cache (word, initial_form, part_of_speech, grammemes)
+                     values (?, ?, ?, ?)"""
+            self.cursor.executemany(sql, [(it.word, it.initial_form, it.part_of_speech, it.grammemes)
+                                          for it in (result[word_str] for word_str in misses)])
+        return result
+
+    def check_morph_cache_internal(self):
+        """Clears morph_cache if it was filled by different version of analyzer"""
+        version = ling.word.get_morph_version()
+        sql = """select value from metadata where name = 'morph_version'"""
+        row = self.cursor.execute(sql).fetchone()
+        if row is not None and row[0] == version:
+            return
+        with self.transaction():
+            if row is not None:
+                logging.info("Morph analyzer changed from '%s' to '%s', clearing morph cache" % (row[0], version))
+            self.cursor.execute("""delete from morph_cache""")
+            sql = """insert or replace into metadata (name, value) values ('morph_version', ?)"""
+            self.cursor.execute(sql, (version,))
+
+    @require_db
+    def fill_word_grammemes(self, limit: int = None) -> int:
+        """
+        Analyses up to limit words which were added before grammemes were stored, all of them if limit is None.
+        Words are filled in batches of GRAMMEMES_FILL_BATCH, each in its own transaction.
+        Returns number of words which still have no grammemes
+        """
+        sql = """select id from word where grammemes is null order by id limit (?)"""
+        self.fill_word_grammemes_internal(self.execute(sql, -1 if limit is None else limit))
+        return self.execute("""select count(*) from word where grammemes is null""")[0]
+
+    def fill_word_grammemes_internal(self, ids: List[WordID]) -> bool:
+        """
+        Analyses words with given ids which have no grammemes yet.
+        Returns False if they can't be changed, because database is open read only or in other thread
+        """
+        if not ids:
+            return True
+        if not self.is_writer_thread or OPEN_PROFILES[self.profile].query_only:
+            return False
+        logging.info("Filling grammemes of %d words" % len(ids))
+        for chunk in chunked(ids, GRAMMEMES_FILL_BATCH):
+            with self.transaction():
+                sql = """select word from word where id in (%s) and grammemes is null"""
+                word_strs = unwrap(self.select_in_internal(sql, chunk))
+                analysed = self.analyse_words_internal(word_strs)
+                sql = """update word set grammemes = (?) where word = (?)"""
+                self.cursor.executemany(sql, [(analysed[it].grammemes, it) for it in word_strs])
+        return True
+
+    def insert_words_internal(self, word_strs: List[str]) -> Dict[str, WordID]:
+        """
+        Analyses words and inserts missing words and their initial forms.
+        Returns ids of words and their initial forms by their strings
+        """
+        analysed = {}
+        pending = list(dict.fromkeys(word_strs))
+        while pending:
+            analysed.update(self.analyse_words_internal(pending))
+            # Initial forms are analysed too, because they are inserted as words
+            pending = list(dict.fromkeys(analysed[it].initial_form for it in pending
+                                         if analysed[it].initial_form is not None
+                                         and analysed[it].initial_form not in analysed))
+
+        sql = """select word, id from word where word in (%s)"""
+        result = dict(self.select_in_internal(sql, analysed.keys()))
+        missing = [it for it in analysed.values() if it.word not in result]
+        if missing:
+            logging.info("Inserting %d words" % len(missing))
+        while missing:
+            # Initial forms have to be inserted before words referencing them
+            ready = [it for it in missing if it.initial_form is None or it.initial_form in result]
+            assert ready
+            sql = """insert or ignore into word
+                     (word, part_of_speech, initial_form_id, has_initial_form, grammemes)
+                     values (?, ?, ?, ?, ?)"""
+            self.cursor.executemany(sql, [(it.word, it.part_of_speech, result.get(it.initial_form),
+                                           it.initial_form is not None, it.grammemes) for it in ready])
+            sql = """select word, id from word where word in (%s)"""
+            result.update(self.select_in_internal(sql, [it.word for it in ready]))
+            missing = [it for it in missing if it.word not in result]
+            self.add_fuzzy_index_changes_internal([(it.word, True) for it in ready])
+        return result
+
+    @require_db
+    def get_or_insert_words(self, word_strs: Iterable[str]) -> Dict[str, WordID]:
+        """
+        Returns ids of words by their lowercase strings, inserting missing words and their initial forms.
+        Words are looked up in word_ids first, then in database, and only new words are analysed
+        """
+        result = {}
+        misses = []
+        for word_str in dict.fromkeys(it.lower() for it in word_strs):
+            if not word_str:
+                logging.warning("Empty word supplied to get_or_insert_words")
+            word_id = self.word_ids.get(word_str)
+            if word_id is not None:
+                result[word_str] = word_id
             else:
-                logging.debug("Collocation %d %s is already present " % (col.sg, str(col_words)))
-                col_id = col_id[0]
-
-            sql = """insert into Sentence_Collocation_Junction (sent_id, col_id)
-                     values (?, ?)"""
-            self.execute(sql, sentence_id, col_id)
-            col_ids.append(col_id)
-
-        logging.info("Inserting %d cons" % len(sent.cons))
-        for con in sent.cons:
-            sql = """insert or ignore into Conn (predicate, object) 
-                     values(?, ?)
-                     """
-            conn_col_ids = (col_ids[con.predicate_idx], col_ids[con.actant_idx])
-            self.execute(sql, *conn_col_ids)
-
-            sql = """select id from Conn
-                     where predicate = (?) and object = (?)"""
-            conn_id = safe_unpack(self.execute(sql, *conn_col_ids))
-            sql = """insert into Sentence_Connection_Junction (sent_id, con_id)
-                     values(?, ?)"""
-            self.execute(sql, sentence_id, conn_id)
+                misses.append(word_str)
+        self.word_ids_stats.hits += len(result)
+        self.word_ids_stats.misses += len(misses)
+
+        if misses:
+            sql = """select word, id from word where word in (%s)"""
+            found = dict(self.select_in_internal(sql, misses))
+            new_words = [it for it in misses if it not in found]
+            if new_words:
+                found.update(self.insert_words_internal(new_words))
+            self.set_word_ids_internal(found.items())
+            result.update((it, found[it]) for it in misses)
+        return result
 
-        self.database.commit()
+    def set_word_ids_internal(self, changes: Iterable[Tuple[str, Union[WordID, None]]]):
+        """
+        Records ids of words, None for deleted words. Inside transaction() they are applied to word_ids
+        when it commits, deleted words are removed from word_ids at once
+        """
+        if not self.transaction_depth:
+            self.update_word_ids_internal(changes)
+            return
+        for word, id_ in changes:
+            if id_ is None:
+                self.word_ids.pop(word, None)
+            self.pending_word_ids.append((word, id_))
+
+    def update_word_ids_internal(self, changes: Iterable[Tuple[str, Union[WordID, None]]]):
+        for word, id_ in changes:
+            if id_ is None:
+                self.word_ids.pop(word, None)
+            else:
+                self.word_ids[word] = id_
+
+    def get_word_cache_stats(self) -> CacheStats:
+        return dataclasses.replace(self.word_ids_stats, size=len(self.word_ids))
 
     @require_db
     def get_or_insert_word(self, word_str: str) -> WordID:
         if not word_str:
             logging.warning("Empty word supplied to get_or_insert_word")
-        word_str = word_str.lower()
-        word = ling.word.analyse_word(word_str)
-        if word.initial_form is not None:
-            initial_form_id = self.get_or_insert_word(word.initial_form)
-        else:
-            initial_form_id = None
-        form_sql_data = (word.word, word.part_of_speech, initial_form_id, initial_form_id is not None)
-        sql = """select id from word where word = (?) and part_of_speech = (?) and initial_form_id = (?) and has_initial_form = (?)"""
-        ids = self.execute(sql, *form_sql_data)
-        if not ids:
-            sql = """insert or ignore into word 
-                    (word, part_of_speech, initial_form_id, has_initial_form) 
-                    values (?, ?, ?, ?)"""
-            self.execute(sql, *form_sql_data)
-
-            sql = """select id from word
-                    where word = (?) and part_of_speech = (?) and (initial_form_id = (?) or not has_initial_form) """
-            word_id = safe_unpack(self.execute(sql, *form_sql_data[:3]))
-            logging.info("Inserted word %s" % word)
-        else:
-            logging.info("Word %s is already present" % word)
-        return word_id
+        return self.get_or_insert_words([word_str])[word_str.lower()]
 
     @require_db
     def add_sg(self, name: str) -> SemanticGroupID:
@@ -585,12 +1965,12 @@ class DB:
         if sg:
             logging.warning("Semantic group %s is already defined (id %d)", name, sg)
         else:
-            sql = """insert into semantic_group(name) values (?)"""
-            self.execute(sql, name)
-            sg = self.get_sg_id_by_name(name)
-            assert sg is not None and sg
+            with self.transaction():
+                sql = """insert into semantic_group(name) values (?)"""
+                self.execute(sql, name)
+                sg = self.get_sg_id_by_name(name)
+                assert sg is not None and sg
             logging.info("Inserted semantic group %s" % name)
-            self.database.commit()
         return sg
         
     @require_db 
@@ -600,9 +1980,9 @@ class DB:
         if sg is None:
             logging.error("Semantic group %d does not exist" % id_)
         else:
-            sql = """delete from semantic_group where id = (?)"""
-            self.execute(sql, id_)
-            self.database.commit()
+            with self.transaction():
+                sql = """delete from semantic_group where id = (?)"""
+                self.execute(sql, id_)
 
     @require_db
     def get_words_with_initial_form(self, word_id: WordID) -> List[WordID]:
@@ -613,9 +1993,9 @@ class DB:
 
     @require_db
     def change_sg_name(self, sg_id: SemanticGroupID, name: str):
-        sql = """update semantic_group set name = (?) where id = (?)"""
-        self.execute(sql, name, sg_id)
-        self.database.commit()
+        with self.transaction():
+            sql = """update semantic_group set name = (?) where id = (?)"""
+            self.execute(sql, name, sg_id)
 
 
 
@@ -0,0 +1,99 @@
+import itertools
+from typing import Dict, List, Set, Tuple
+
+# Misspellings further than this are not looked up. Index size grows quickly with distance,
+#  for distance 2 it is about three times larger and four times slower to build than for 1
+DEFAULT_MAX_DISTANCE = 1
+# Only deletes in first characters of word are indexed, it limits number of index keys per word.
+# Candidates are checked with full words, so nothing is missed
+DEFAULT_PREFIX_LENGTH = 7
+
+
+def normalize_word(word: str) -> str:
+    """Brings word to the form used for comparison, 'ё' is very often written as 'е'"""
+    return word.lower().replace("ё", "е")
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Returns number of insertions, deletions, substitutions and transpositions of adjacent characters
+    needed to make b from a, or max_distance + 1 if there are more of them
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    prev_prev = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev_prev[j - 2] + 1)
+        # Transposition looks two rows back, so both rows have to be over limit
+        if min(cur) > max_distance and min(prev) > max_distance:
+            return max_distance + 1
+        prev_prev, prev = prev, cur
+    return min(prev[len(b)], max_distance + 1)
+
+
+def get_deletes(word: str, max_distance: int) -> Set[str]:
+    """Returns all strings made by deleting up to max_distance characters from word, including word itself"""
+    result = {word}
+    edges = {word}
+    for _ in range(max_distance):
+        edges = {it[:idx] + it[idx + 1:] for it in edges for idx in range(len(it))}
+        result.update(edges)
+    return result
+
+
+class FuzzyIndex:
+    """
+    Symmetric delete index for looking up words by misspelled string.
+    Each word is stored under all strings made by deleting up to max_distance characters from it,
+    so two words within max_distance of each other always share one of such strings
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE, prefix_length: int = DEFAULT_PREFIX_LENGTH):
+        self.max_distance: int = max_distance
+        self.prefix_length: int = prefix_length
+        self.deletes: Dict[str, List[str]] = {}
+        self.words: Set[str] = set()
+
+    def __len__(self):
+        return len(self.words)
+
+    def get_keys_internal(self, normalized: str) -> Set[str]:
+        return get_deletes(normalized[:self.prefix_length], self.max_distance)
+
+    def add(self, word: str):
+        if word in self.words:
+            return
+        self.words.add(word)
+        for key in self.get_keys_internal(normalize_word(word)):
+            self.deletes.setdefault(key, []).append(word)
+
+    def remove(self, word: str):
+        if word not in self.words:
+            return
+        self.words.remove(word)
+        for key in self.get_keys_internal(normalize_word(word)):
+            words = self.deletes[key]
+            words.remove(word)
+            if not words:
+                del self.deletes[key]
+
+    def lookup(self, word: str, max_distance: int = None) -> List[Tuple[str, int]]:
+        """Returns words within max_distance from word and their distances, closest first"""
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+        normalized = normalize_word(word)
+        keys = get_deletes(normalized[:self.prefix_length], max_distance)
+        candidates = set(itertools.chain.from_iterable(self.deletes.get(it, ()) for it in keys))
+        result = []
+        for candidate in candidates:
+            distance = edit_distance(normalized, normalize_word(candidate), max_distance)
+            if distance <= max_distance:
+                result.append((candidate, distance))
+        result.sort(key=lambda it: (it[1], it[0]))
+        return result
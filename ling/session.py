@@ -1,7 +1,12 @@
 import logging
 import os
-from typing import List, Tuple
+import collections
+from typing import List, Tuple, Callable, Union
 import ling.db as db
+import ling.corpus
+
+# Max number of records stored in RecordCache
+RECORD_CACHE_SIZE = 16384
 
 
 def get_config_filename():
@@ -10,9 +15,65 @@ def get_config_filename():
     return config_file
 
 
+class RecordCache:
+    """
+    Identity map of database records by their type and id, so records shown on screen are not queried again
+    for each row. Least recently used records are evicted when there are more than max_size of them.
+    All records are dropped when database is changed, which is detected by DB.write_version
+    """
+
+    def __init__(self, database: db.DB, max_size: int = RECORD_CACHE_SIZE):
+        self.db = database
+        self.max_size = max_size
+        self.records: collections.OrderedDict = collections.OrderedDict()
+        self.write_version = database.write_version
+        self.stats = db.CacheStats()
+
+    def get_many(self, type_: type, ids: list, load: Callable[[list], list]) -> list:
+        """Returns records with given ids in the same order, querying missing ones with load in one call"""
+        if self.write_version != self.db.write_version:
+            self.records.clear()
+            self.write_version = self.db.write_version
+        result = []
+        misses = []
+        for id_ in ids:
+            record = self.records.get((type_, id_))
+            if record is not None:
+                self.records.move_to_end((type_, id_))
+            else:
+                misses.append(id_)
+            result.append(record)
+        self.stats.hits += len(ids) - len(misses)
+        self.stats.misses += len(misses)
+
+        if misses:
+            unique_misses = list(dict.fromkeys(misses))
+            # Nothing is loaded if database is not connected
+            loaded = dict(zip(unique_misses, load(unique_misses) or []))
+            for idx, record in enumerate(result):
+                if record is None:
+                    result[idx] = loaded.get(ids[idx])
+            for id_, record in loaded.items():
+                if record is not None:
+                    self.records[(type_, id_)] = record
+            while len(self.records) > self.max_size:
+                self.records.popitem(last=False)
+        return result
+
+    def get_stats(self) -> db.CacheStats:
+        return db.CacheStats(self.stats.hits, self.stats.misses, len(self.records))
+
+
 class Session:
     def __init__(self):
         self.db = db.DB()
+        self.records = RecordCache(self.db)
+        # If set, navigation between records uses in-memory copy of database relations instead of queries.
+        #  It is enabled for read only analytics profile, where database doesn't change
+        self.corpus_index_enabled = False
+        self.corpus_index: Union[ling.corpus.CorpusIndex, None] = None
+        # Name of DB profile (see ling.db.OPEN_PROFILES), can be set in second line of config
+        self.db_profile = db.PROFILE_INTERACTIVE
 
         # Try to load config
         config_filename = get_config_filename()
@@ -23,6 +84,10 @@ class Session:
                     data = f.readline()
                     db_name = data.strip()
                     logging.info("Config db path: '%s'", db_name)
+                    profile = f.readline().strip()
+                    if profile:
+                        logging.info("Config db profile: '%s'", profile)
+                        self.set_db_profile(profile)
                     if os.path.exists(db_name):
                         self.init_for_db(db_name, False)
             except OSError:
@@ -32,36 +97,122 @@ class Session:
     def connected(self):
         return self.db.connected
 
-    def init_for_db(self, db_name: str, save_config: bool = True):
-        self.db.create_or_open(db_name)
+    def set_db_profile(self, profile: str):
+        """Sets profile used for opening DB, unknown profile names are ignored"""
+        if profile not in db.OPEN_PROFILES:
+            logging.error("Unknown DB profile '%s', using '%s'", profile, self.db_profile)
+            return
+        self.db_profile = profile
+
+    def init_for_db(self, db_name: str, save_config: bool = True, profile: str = None):
+        if profile is not None:
+            self.set_db_profile(profile)
+        self.db.create_or_open(db_name, self.db_profile)
+        # Profile actually applied by DB is stored, so it is what is written to config
+        self.db_profile = self.db.profile
+        self.corpus_index = None
+        self.corpus_index_enabled = self.db_profile == db.PROFILE_READ_ONLY_ANALYTICS
         # Try to save to config
         if save_config:
             try:
                 config_filename = get_config_filename()
                 with open(config_filename, "w", encoding="utf8") as f:
-                    f.write(db_name)
+                    f.write(db_name + "\n")
+                    f.write(self.db_profile)
                 logging.info("Saved db '%s' to config", db_name)
             except OSError:
                 logging.info("Failed to write config file")
 
     def get_cols_from_ids(self, ids: List[db.CollocationID]) -> List[db.Collocation]:
-        return [self.db.get_col(col_id) for col_id in ids]
+        return self.records.get_many(db.Collocation, ids, self.db.get_cols)
 
     def get_cons_from_ids(self, ids: List[db.ConnID]) -> List[db.Connection]:
-        return [self.db.get_con(col_id) for col_id in ids]
+        return self.records.get_many(db.Connection, ids, self.db.get_cons)
 
     def get_words_from_ids(self, ids: List[db.WordID]) -> List[db.Word]:
-        return [self.db.get_word(id_) for id_ in ids]
+        return self.records.get_many(db.Word, ids, self.db.get_words)
+
+    def get_word(self, id_: db.WordID) -> db.Word:
+        return self.get_words_from_ids([id_])[0]
+
+    def get_col(self, id_: db.CollocationID) -> db.Collocation:
+        return self.get_cols_from_ids([id_])[0]
+
+    def get_sg(self, id_: db.SemanticGroupID) -> db.SemanticGroup:
+        return self.get_sgs_from_ids([id_])[0]
+
+    def get_record_cache_stats(self) -> db.CacheStats:
+        return self.records.get_stats()
+
+    def get_corpus_index(self) -> Union[ling.corpus.CorpusIndex, None]:
+        """Returns corpus index if it is enabled, rebuilding it if database was changed"""
+        if not self.corpus_index_enabled or not self.connected:
+            return None
+        if self.corpus_index is None or self.corpus_index.write_version != self.db.write_version:
+            self.corpus_index = ling.corpus.CorpusIndex(self.db)
+        return self.corpus_index
+
+    def get_col_ids_of_words(self, ids: List[db.WordID]) -> List[db.CollocationID]:
+        corpus = self.get_corpus_index()
+        if corpus is not None:
+            return corpus.word_cols.get_many(ids)
+        return self.db.get_col_ids_with_word_ids(ids)
+
+    def get_con_ids_of_cols(self, ids: List[db.CollocationID]) -> List[db.ConnID]:
+        corpus = self.get_corpus_index()
+        if corpus is not None:
+            return corpus.col_cons.get_many(ids)
+        return self.db.get_con_ids_with_col_ids(ids)
+
+    def get_sentence_ids_of_words(self, ids: List[db.WordID]) -> List[db.SentenceID]:
+        corpus = self.get_corpus_index()
+        if corpus is not None:
+            return corpus.word_sents.get_many(ids)
+        return self.db.get_sentence_ids_with_word_ids(ids)
+
+    def get_col_ids_of_sgs(self, ids: List[db.SemanticGroupID]) -> List[db.CollocationID]:
+        corpus = self.get_corpus_index()
+        if corpus is not None:
+            return corpus.sg_cols.get_many(ids)
+        return self.db.get_col_ids_of_sgs(ids)
+
+    def get_word_ids_of_sgs(self, ids: List[db.SemanticGroupID]) -> List[db.WordID]:
+        corpus = self.get_corpus_index()
+        if corpus is not None:
+            return corpus.get_words_of_sgs(ids)
+        return self.db.get_word_ids_of_sgs(ids)
+
+    def get_word_ids_with_initial_forms(self, ids: List[db.WordID]) -> List[db.WordID]:
+        corpus = self.get_corpus_index()
+        if corpus is not None:
+            return corpus.initial_form_words.get_many(ids)
+        return self.db.get_word_ids_with_initial_forms(ids)
+
+    def get_initial_form_word_ids(self) -> List[db.WordID]:
+        """Returns ids of all words which are initial forms themselves"""
+        corpus = self.get_corpus_index()
+        if corpus is not None:
+            return corpus.get_initial_form_word_ids()
+        return self.db.get_initial_form_word_ids()
+
+    def get_initial_forms_of_words(self, words: List[db.Word]) -> List[db.Word]:
+        """Returns distinct initial forms of words which have them"""
+        ids = sorted({word.initial_form_id for word in words if word.initial_form_id is not None})
+        return self.get_words_from_ids(ids)
+
+    def get_similar_words(self, word: str, max_distance: int = 1) -> List[db.Word]:
+        """Returns words which may be meant by misspelled word, closest first"""
+        return self.get_words_from_ids([id_ for id_, _ in self.db.search_words_fuzzy(word, max_distance)])
 
     def get_sents_from_ids(self, ids: List[db.SentenceID]) -> List[db.Sentence]:
-        return [self.db.get_sentence(id_) for id_ in ids]
+        return self.records.get_many(db.Sentence, ids, self.db.get_sentences)
 
     def get_sgs_from_ids(self, ids: List[db.SemanticGroupID]) -> List[db.SemanticGroup]:
-        return [self.db.get_sg(id_) for id_ in ids]
+        return self.records.get_many(db.SemanticGroup, ids, self.db.get_sgs)
 
     def create_sent_ctx_from_db(self, id_: db.SentenceID) -> "ling.Sentence":
         import ling.sentence
-        sent = self.db.get_sentence(id_)
+        sent = self.get_sents_from_ids([id_])[0]
         sent_cols = self.get_cols_from_ids(sent.cols)
         sent_cons = self.get_cons_from_ids(sent.cons)
         cols = []
@@ -79,10 +230,10 @@ class Session:
         # @NOTE(hl): Wrapper for conditional
         # @TODO(hl): It may be beneficial to always store initial_form_id and detect it is the initial form by comparing
         #  ids?
-        return self.db.get_word(word.initial_form_id) if word.initial_form_id is not None else word
+        return self.get_word(word.initial_form_id) if word.initial_form_id is not None else word
 
     def get_initial_form_by_id(self, word_id: db.WordID) -> db.Word:
-        return self.get_initial_form(self.db.get_word(word_id))
+        return self.get_initial_form(self.get_word(word_id))
 
     def get_words_of_sg(self, sg: db.SemanticGroupID) -> List[db.WordID]:
         # @TODO(hl): SPEED
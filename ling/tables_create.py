@@ -1,4 +1,8 @@
-TABLES = """create table if not exists semantic_group (
+TABLES = """create table if not exists schema_version (
+    version integer not null
+);
+
+create table if not exists semantic_group (
     id integer primary key,
     name text not null
 );
@@ -102,4 +106,311 @@ create table if not exists sentence_word_junction (
     foreign key(sent_id) references sentence(id),
     foreign key(word_id) references word(id)
 );
-"""
\ No newline at end of file
+"""
+
+# Scripts upgrading schema created by TABLES.
+# Migration with index i brings schema to version i + 1, applied version is stored in schema_version table
+MIGRATIONS = [
+    # 1: junction tables have composite primary keys and are never referenced by rowid,
+    #  so they are stored as clustered b-trees without rowid
+    """create table collocation_junction_new (
+    idx integer not null,
+    word_id integer not null,
+    col_id integer not null,
+    constraint pk primary key (
+        idx,
+        word_id,
+        col_id
+    ),
+
+    foreign key(word_id) references word(id),
+    foreign key(col_id) references collocation(id)
+) without rowid;
+insert into collocation_junction_new (idx, word_id, col_id)
+    select idx, word_id, col_id from collocation_junction;
+drop table collocation_junction;
+alter table collocation_junction_new rename to collocation_junction;
+
+create table sentence_collocation_junction_new (
+    sent_id integer not null,
+    col_id integer not null,
+    constraint pk primary key (
+       sent_id,
+       col_id
+    ),
+
+    foreign key(sent_id) references sentence(id),
+    foreign key(col_id) references collocation(id)
+) without rowid;
+insert into sentence_collocation_junction_new (sent_id, col_id)
+    select sent_id, col_id from sentence_collocation_junction;
+drop table sentence_collocation_junction;
+alter table sentence_collocation_junction_new rename to sentence_collocation_junction;
+
+create table sentence_connection_junction_new (
+    sent_id integer not null,
+    con_id integer not null,
+    constraint pk primary key (
+       sent_id,
+       con_id
+    ),
+
+    foreign key(sent_id) references sentence(id),
+    foreign key(con_id) references conn(id)
+) without rowid;
+insert into sentence_connection_junction_new (sent_id, con_id)
+    select sent_id, con_id from sentence_connection_junction;
+drop table sentence_connection_junction;
+alter table sentence_connection_junction_new rename to sentence_connection_junction;
+
+create table sentence_word_junction_new (
+    sent_id integer not null,
+    word_id   integer not null,
+    idx      integer not null,
+    text_idx integer not null, -- index in sentence text
+    constraint pk primary key (
+        sent_id,
+        word_id,
+        idx
+    ),
+
+    foreign key(sent_id) references sentence(id),
+    foreign key(word_id) references word(id)
+) without rowid;
+insert into sentence_word_junction_new (sent_id, word_id, idx, text_idx)
+    select sent_id, word_id, idx, text_idx from sentence_word_junction;
+drop table sentence_word_junction;
+alter table sentence_word_junction_new rename to sentence_word_junction;
+""",
+    # 2: secondary indexes for lookups not covered by primary keys and uniq constraints
+    #  (collocation.sg_id is already covered by collocation uniq constraint, conn.predicate - by conn uniq)
+    """create index if not exists word_initial_form_id_idx on word (initial_form_id);
+create index if not exists collocation_word_hash_idx on collocation (word_hash);
+create index if not exists collocation_junction_col_idx on collocation_junction (col_id, idx, word_id);
+create index if not exists collocation_junction_word_idx on collocation_junction (word_id, col_id);
+create index if not exists conn_object_idx on conn (object, predicate);
+create index if not exists sentence_collocation_junction_col_idx on sentence_collocation_junction (col_id, sent_id);
+create index if not exists sentence_connection_junction_con_idx on sentence_connection_junction (con_id, sent_id);
+create index if not exists sentence_word_junction_sent_idx on sentence_word_junction (sent_id, idx, word_id);
+create index if not exists sentence_word_junction_word_idx on sentence_word_junction (word_id, sent_id);
+""",
+    # 3: record counts for statistics, maintained by triggers
+    """create table corpus_counter (
+    name text primary key,
+    value integer not null
+) without rowid;
+
+insert into corpus_counter (name, value) values
+    ('semantic_group', (select count(*) from semantic_group)),
+    ('word', (select count(*) from word)),
+    ('initial_form', (select count(*) from word where initial_form_id is null)),
+    ('collocation', (select count(*) from collocation)),
+    ('conn', (select count(*) from conn)),
+    ('sentence', (select count(*) from sentence));
+
+create trigger semantic_group_count_insert after insert on semantic_group begin
+    update corpus_counter set value = value + 1 where name = 'semantic_group';
+end;
+create trigger semantic_group_count_delete after delete on semantic_group begin
+    update corpus_counter set value = value - 1 where name = 'semantic_group';
+end;
+
+create trigger word_count_insert after insert on word begin
+    update corpus_counter set value = value + 1 where name = 'word';
+    update corpus_counter set value = value + 1 where name = 'initial_form' and new.initial_form_id is null;
+end;
+create trigger word_count_delete after delete on word begin
+    update corpus_counter set value = value - 1 where name = 'word';
+    update corpus_counter set value = value - 1 where name = 'initial_form' and old.initial_form_id is null;
+end;
+create trigger word_count_update after update of initial_form_id on word begin
+    update corpus_counter set value = value
+        + (new.initial_form_id is null) - (old.initial_form_id is null) where name = 'initial_form';
+end;
+
+create trigger collocation_count_insert after insert on collocation begin
+    update corpus_counter set value = value + 1 where name = 'collocation';
+end;
+create trigger collocation_count_delete after delete on collocation begin
+    update corpus_counter set value = value - 1 where name = 'collocation';
+end;
+
+create trigger conn_count_insert after insert on conn begin
+    update corpus_counter set value = value + 1 where name = 'conn';
+end;
+create trigger conn_count_delete after delete on conn begin
+    update corpus_counter set value = value - 1 where name = 'conn';
+end;
+
+create trigger sentence_count_insert after insert on sentence begin
+    update corpus_counter set value = value + 1 where name = 'sentence';
+end;
+create trigger sentence_count_delete after delete on sentence begin
+    update corpus_counter set value = value - 1 where name = 'sentence';
+end;
+""",
+    # 4: full-text indexes. They depend on SQLite build, so they are created from FTS_TABLES
+    #  by DB.create_fts_tables_internal instead
+    "",
+    # 5: number of times each pair of initial forms is met together in cols of sentences.
+    #  Pair is stored once with lemma_a < lemma_b, each entry of col in sentence counts its pairs once
+    """create table word_cooccurrence (
+    lemma_a integer not null,
+    lemma_b integer not null,
+    count integer not null,
+    constraint pk primary key (
+        lemma_a,
+        lemma_b
+    ),
+
+    foreign key(lemma_a) references word(id),
+    foreign key(lemma_b) references word(id)
+) without rowid;
+create index word_cooccurrence_lemma_b_idx on word_cooccurrence (lemma_b, lemma_a);
+
+insert into word_cooccurrence (lemma_a, lemma_b, count)
+    select p.lemma_a, p.lemma_b, count(*) from (
+        select distinct
+            j1.col_id as col_id,
+            min(coalesce(w1.initial_form_id, w1.id), coalesce(w2.initial_form_id, w2.id)) as lemma_a,
+            max(coalesce(w1.initial_form_id, w1.id), coalesce(w2.initial_form_id, w2.id)) as lemma_b
+        from collocation_junction j1
+        join collocation_junction j2 on j2.col_id = j1.col_id and j2.idx > j1.idx
+        join word w1 on w1.id = j1.word_id
+        join word w2 on w2.id = j2.word_id
+        where coalesce(w1.initial_form_id, w1.id) != coalesce(w2.initial_form_id, w2.id)
+    ) p
+    join sentence_collocation_junction s on s.col_id = p.col_id
+    group by p.lemma_a, p.lemma_b;
+
+create trigger word_cooccurrence_insert after insert on sentence_collocation_junction begin
+    insert into word_cooccurrence (lemma_a, lemma_b, count)
+        select distinct
+            min(coalesce(w1.initial_form_id, w1.id), coalesce(w2.initial_form_id, w2.id)),
+            max(coalesce(w1.initial_form_id, w1.id), coalesce(w2.initial_form_id, w2.id)),
+            1
+        from collocation_junction j1
+        join collocation_junction j2 on j2.col_id = j1.col_id and j2.idx > j1.idx
+        join word w1 on w1.id = j1.word_id
+        join word w2 on w2.id = j2.word_id
+        where j1.col_id = new.col_id
+            and coalesce(w1.initial_form_id, w1.id) != coalesce(w2.initial_form_id, w2.id)
+        on conflict (lemma_a, lemma_b) do update set count = count + 1;
+end;
+create trigger word_cooccurrence_delete after delete on sentence_collocation_junction begin
+    update word_cooccurrence set count = count - 1 where (lemma_a, lemma_b) in (
+        select
+            min(coalesce(w1.initial_form_id, w1.id), coalesce(w2.initial_form_id, w2.id)),
+            max(coalesce(w1.initial_form_id, w1.id), coalesce(w2.initial_form_id, w2.id))
+        from collocation_junction j1
+        join collocation_junction j2 on j2.col_id = j1.col_id and j2.idx > j1.idx
+        join word w1 on w1.id = j1.word_id
+        join word w2 on w2.id = j2.word_id
+        where j1.col_id = old.col_id
+            and coalesce(w1.initial_form_id, w1.id) != coalesce(w2.initial_form_id, w2.id)
+    );
+    delete from word_cooccurrence where count = 0 and (lemma_a, lemma_b) in (
+        select
+            min(coalesce(w1.initial_form_id, w1.id), coalesce(w2.initial_form_id, w2.id)),
+            max(coalesce(w1.initial_form_id, w1.id), coalesce(w2.initial_form_id, w2.id))
+        from collocation_junction j1
+        join collocation_junction j2 on j2.col_id = j1.col_id and j2.idx > j1.idx
+        join word w1 on w1.id = j1.word_id
+        join word w2 on w2.id = j2.word_id
+        where j1.col_id = old.col_id
+    );
+end;
+""",
+    # 6: results of morphological analysis by word, so known words are not analysed again.
+    #  They are valid for analyzer version stored in metadata
+    """create table metadata (
+    name text primary key,
+    value text
+) without rowid;
+
+create table morph_cache (
+    word text primary key,
+    initial_form text,
+    part_of_speech integer not null
+) without rowid;
+""",
+    # 7: bitmask of grammemes of words (see ling.word.GRAMMEMES). It is null until word is analysed,
+    #  existing words are analysed when DB is opened. Cached analysis results have no grammemes, so they are dropped
+    """alter table word add column grammemes integer;
+
+create index word_grammemes_idx on word(grammemes);
+
+drop table morph_cache;
+
+create table morph_cache (
+    word text primary key,
+    initial_form text,
+    part_of_speech integer not null,
+    grammemes integer not null
+) without rowid;
+""",
+    # 8: triggers of full-text indexes of migration 4 are replaced by triggers from FTS_TABLES,
+    #  one set per index, so each index can exist without the others
+    """drop trigger if exists sentence_fts_insert;
+drop trigger if exists sentence_fts_delete;
+drop trigger if exists sentence_fts_update;
+drop trigger if exists word_fts_insert;
+drop trigger if exists word_fts_delete;
+drop trigger if exists word_fts_update;
+""",
+]
+
+# Full-text indexes by name: SQLite feature they need ('fts5' or 'trigram'), table and triggers keeping it in sync.
+#  They are external content tables, so texts are not stored twice. sentence_fts is tokenized by words
+#  for phrase and prefix search, *_trigram_fts are used for substring search.
+#  Triggers are named <index>_on_insert, <index>_on_delete and <index>_on_update
+FTS_TABLES = {
+    "sentence_fts": ("fts5", """create virtual table if not exists sentence_fts using fts5(
+    contents,
+    content='sentence',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 0'
+);""", """create trigger if not exists sentence_fts_on_insert after insert on sentence begin
+    insert into sentence_fts (rowid, contents) values (new.id, new.contents);
+end;
+create trigger if not exists sentence_fts_on_delete after delete on sentence begin
+    insert into sentence_fts (sentence_fts, rowid, contents) values ('delete', old.id, old.contents);
+end;
+create trigger if not exists sentence_fts_on_update after update of contents on sentence begin
+    insert into sentence_fts (sentence_fts, rowid, contents) values ('delete', old.id, old.contents);
+    insert into sentence_fts (rowid, contents) values (new.id, new.contents);
+end;
+"""),
+    "sentence_trigram_fts": ("trigram", """create virtual table if not exists sentence_trigram_fts using fts5(
+    contents,
+    content='sentence',
+    content_rowid='id',
+    tokenize='trigram'
+);""", """create trigger if not exists sentence_trigram_fts_on_insert after insert on sentence begin
+    insert into sentence_trigram_fts (rowid, contents) values (new.id, new.contents);
+end;
+create trigger if not exists sentence_trigram_fts_on_delete after delete on sentence begin
+    insert into sentence_trigram_fts (sentence_trigram_fts, rowid, contents) values ('delete', old.id, old.contents);
+end;
+create trigger if not exists sentence_trigram_fts_on_update after update of contents on sentence begin
+    insert into sentence_trigram_fts (sentence_trigram_fts, rowid, contents) values ('delete', old.id, old.contents);
+    insert into sentence_trigram_fts (rowid, contents) values (new.id, new.contents);
+end;
+"""),
+    "word_trigram_fts": ("trigram", """create virtual table if not exists word_trigram_fts using fts5(
+    word,
+    content='word',
+    content_rowid='id',
+    tokenize='trigram'
+);""", """create trigger if not exists word_trigram_fts_on_insert after insert on word begin
+    insert into word_trigram_fts (rowid, word) values (new.id, new.word);
+end;
+create trigger if not exists word_trigram_fts_on_delete after delete on word begin
+    insert into word_trigram_fts (word_trigram_fts, rowid, word) values ('delete', old.id, old.word);
+end;
+create trigger if not exists word_trigram_fts_on_update after update of word on word begin
+    insert into word_trigram_fts (word_trigram_fts, rowid, word) values ('delete', old.id, old.word);
+    insert into word_trigram_fts (rowid, word) values (new.id, new.word);
+end;
+"""),
+}
@@ -89,7 +89,7 @@ NAV_MODE_SUFFIXES: List[str] = [
 NAV_MODE_HEADERS: List[List[str]] = [
     ["Название", "Число слов", "Число сочетаний", "Число связей"],
     ["Слово", "Часть речи", "Начальная форма", "Число записей", "Число сочетаний", "Число связей", "Число предложений"],
-    ["Слово", "Часть речи", "Число сочетаний", "Число записей", "Число связей"],
+    ["Слово", "Часть речи", "Число записей", "Число сочетаний", "Число связей", "Число предложений"],
     ["Сочетание", "Семантическая роль", "Число записей", "Число связей", "Число предложений"],
     ["Предикат", "Актант", "Роль актанта", "Число записей", "Число предложений"],
     ["Предложение", "Число слов", "Число сочетаний", "Число связей"],
@@ -141,22 +141,16 @@ class NavigationWidget(QtWidgets.QWidget, Ui_Form, DbConnectionInterface):
         self.table.setHorizontalHeaderLabels(headers)
 
         if mode == NAV_MODE_GENERAL and self.session.connected:
-            sg_count = len(self.session.db.get_all_sgs())
-            all_words = self.session.db.get_all_words()
-            word_count = len(all_words)
-            init_word_count = sum(map(lambda it: it.initial_form_id is None, all_words))
-            col_count = len(self.session.db.get_all_cols())
-            con_count = len(self.session.db.get_all_cons())
-            sent_count = len(self.session.db.get_all_sentences())
+            stats = self.session.db.get_corpus_stats()
 
             self.table.setRowCount(1)
             qt_helper.add_table_row(self.table, 0, [
-                str(sg_count),
-                str(word_count),
-                str(init_word_count),
-                str(col_count),
-                str(con_count),
-                str(sent_count),
+                str(stats.sgs),
+                str(stats.words),
+                str(stats.initial_forms),
+                str(stats.cols),
+                str(stats.cons),
+                str(stats.sentences),
             ])
             self.table.resizeColumnsToContents()
             self.table.resizeRowsToContents()
@@ -197,28 +191,32 @@ class NavigationWidget(QtWidgets.QWidget, Ui_Form, DbConnectionInterface):
     def search(self):
         dialog = WordSearchDialog(self.session, self)
         if dialog.exec_() == PyQt5.Qt.QDialog.Accepted:
-            search_str = dialog.input.text()
-            if search_str:
-                words = self.session.db.get_word_ids_by_word_part(search_str)
-                self.display_table_words(self.session.get_words_from_ids(words))
+            search_str = dialog.input.text().strip()
+            if " " in search_str:
+                # Several words are searched as phrase in sentences
+                sents = self.session.db.search_sentences_by_phrase(search_str)
+                self.display_table_sents(self.session.get_sents_from_ids(sents))
+            elif search_str:
+                words = self.session.db.search_words_by_substring(search_str)
+                if words:
+                    self.display_table_words(self.session.get_words_from_ids(words))
+                else:
+                    # Nothing found, word is probably misspelled
+                    self.display_table_words(self.session.get_similar_words(search_str))
 
     def display_table_sgs(self, sgs: List[ling.db.SemanticGroup]):
         self.mode_storage = sgs
 
         self.init_mode(NAV_MODE_SG)
         self.table.setRowCount(len(sgs))
+        stats = self.session.db.get_sg_stats([sg.id for sg in sgs])
         for idx, sg in enumerate(sgs):
-            nwords = len(self.session.get_words_of_sg(sg.id))
-            cols = self.session.db.get_cols_of_sg(sg.id)
-            ncons = 0
-            for col in cols:
-                ncons += len(self.session.db.get_con_ids_with_col_id(col))
-            ncols = len(cols)
+            sg_stats = stats[sg.id]
             qt_helper.add_table_row(self.table, idx, [
                 sg.name,
-                str(nwords),
-                str(ncols),
-                str(ncons),
+                str(sg_stats.words),
+                str(sg_stats.cols),
+                str(sg_stats.cons),
             ])
         self.table.resizeColumnsToContents()
         self.table.resizeRowsToContents()
@@ -228,27 +226,20 @@ class NavigationWidget(QtWidgets.QWidget, Ui_Form, DbConnectionInterface):
 
         self.init_mode(NAV_MODE_WORD)
         self.table.setRowCount(len(words))
+        stats = self.session.db.get_word_stats([word.id for word in words])
+        initial_forms = {it.id: it for it in self.session.get_initial_forms_of_words(words) if it is not None}
         for idx, word in enumerate(words):
             pos = ling.word.pos_to_russian(word.pos)
-            init = self.session.get_initial_form(word)
-            print(init, word)
-            init = init.word
-            # FIXME!!!
-            ntimes = 0
-            cols = self.session.db.get_col_ids_with_word_id(word.id)
-            ncons = 0
-            for col in cols:
-                ncons += len(self.session.db.get_con_ids_with_col_id(col))
-            ncols = len(cols)
-            nsents = len(self.session.db.get_sentences_id_by_word_id(word.id))
+            init = initial_forms.get(word.initial_form_id, word).word
+            word_stats = stats[word.id]
             qt_helper.add_table_row(self.table, idx, [
                 word.word,
                 pos,
                 init,
-                str(ntimes),
-                str(ncols),
-                str(ncons),
-                str(nsents)
+                str(word_stats.occurrences),
+                str(word_stats.cols),
+                str(word_stats.cons),
+                str(word_stats.sentences)
             ])
         self.table.resizeColumnsToContents()
         self.table.resizeRowsToContents()
@@ -258,20 +249,16 @@ class NavigationWidget(QtWidgets.QWidget, Ui_Form, DbConnectionInterface):
 
         self.init_mode(NAV_MODE_COL)
         self.table.setRowCount(len(cols))
+        sg_names = {sg.id: sg.name for sg in self.session.db.get_all_sgs()}
+        stats = self.session.db.get_col_stats([col.id for col in cols])
         for idx, col in enumerate(cols):
-            text = col.text
-            sg = self.session.db.get_sg(col.sg_id).name
-            # FIXME!!!
-            nentr = 0
-            ncons = len(self.session.db.get_con_ids_with_col_id(col.id))
-            # FIXME!!!
-            nsents = 0
+            col_stats = stats[col.id]
             qt_helper.add_table_row(self.table, idx, [
-                text,
-                sg,
-                str(nentr),
-                str(ncons),
-                str(nsents)
+                col.text,
+                sg_names[col.sg_id],
+                str(col_stats.occurrences),
+                str(col_stats.cons),
+                str(col_stats.sentences)
             ])
         self.table.resizeColumnsToContents()
         self.table.resizeRowsToContents()
@@ -281,23 +268,20 @@ class NavigationWidget(QtWidgets.QWidget, Ui_Form, DbConnectionInterface):
 
         self.init_mode(NAV_MODE_CON)
         self.table.setRowCount(len(cons))
+        sg_names = {sg.id: sg.name for sg in self.session.db.get_all_sgs()}
+        col_ids = list({col_id for con in cons for col_id in (con.predicate, con.object_)})
+        cols = {col.id: col for col in self.session.get_cols_from_ids(col_ids)}
+        stats = self.session.db.get_con_stats([con.id for con in cons])
         for idx, con in enumerate(cons):
-            pred = self.session.db.get_col(con.predicate)
-            act = self.session.db.get_col(con.object_)
-
-            pred_str = pred.text
-            act_str = act.text
-            act_kind = self.session.db.get_sg(act.sg_id).name
-            # FIXME:
-            nentr = 0
-            # FIXME:
-            nsent = 0
+            pred = cols[con.predicate]
+            act = cols[con.object_]
+            con_stats = stats[con.id]
             qt_helper.add_table_row(self.table, idx, [
-                pred_str,
-                act_str,
-                act_kind,
-                str(nentr),
-                str(nsent),
+                pred.text,
+                act.text,
+                sg_names[act.sg_id],
+                str(con_stats.occurrences),
+                str(con_stats.sentences),
             ])
         self.table.resizeColumnsToContents()
         self.table.resizeRowsToContents()
@@ -326,24 +310,18 @@ class NavigationWidget(QtWidgets.QWidget, Ui_Form, DbConnectionInterface):
 
         self.init_mode(NAV_MODE_INIT_WORD)
         self.table.setRowCount(len(words))
+        # Initial form is shown together with all its forms
+        stats = self.session.db.get_word_stats([word.id for word in words], include_forms=True)
         for idx, word in enumerate(words):
-            word_str = word.word
             pos = ling.word.pos_to_russian(word.pos)
-            # FIXME!!!
-            ntimes = 0
-            cols = self.session.db.get_col_ids_with_word_id(word.id)
-            ncons = 0
-            for col in cols:
-                ncons += len(self.session.db.get_con_ids_with_col_id(col))
-            ncols = len(cols)
-            nsents = len(self.session.db.get_sentences_id_by_word_id(word.id))
+            word_stats = stats[word.id]
             qt_helper.add_table_row(self.table, idx, [
                 word.word,
                 pos,
-                str(ntimes),
-                str(ncols),
-                str(ncons),
-                str(nsents)
+                str(word_stats.occurrences),
+                str(word_stats.cols),
+                str(word_stats.cons),
+                str(word_stats.sentences)
             ])
         self.table.resizeColumnsToContents()
         self.table.resizeRowsToContents()
@@ -361,8 +339,7 @@ class NavigationWidget(QtWidgets.QWidget, Ui_Form, DbConnectionInterface):
         self.display_table_words(all_words)
 
     def word_init_btn_general(self):
-        all_words = self.session.db.get_all_words()
-        init_words = list(filter(lambda it: it.initial_form_id is None, all_words))
+        init_words = self.session.get_words_from_ids(self.session.get_initial_form_word_ids())
         self.display_table_word_inits(init_words)
 
     def col_btn_general(self):
@@ -386,9 +363,7 @@ class NavigationWidget(QtWidgets.QWidget, Ui_Form, DbConnectionInterface):
         if sel_rows:
             words = [self.mode_storage[idx]
                      for idx in sel_rows]
-            word_inits = list({self.session.db.get_word(word.initial_form_id)
-                               for word in words
-                               if word.initial_form_id is not None})
+            word_inits = self.session.get_initial_forms_of_words(words)
             self.display_table_word_inits(word_inits)
 
     def col_btn_word(self):
@@ -396,21 +371,15 @@ class NavigationWidget(QtWidgets.QWidget, Ui_Form, DbConnectionInterface):
         if sel_rows:
             words = [self.mode_storage[idx]
                      for idx in sel_rows]
-            cols = list({col
-                         for word in words
-                         for col in self.session.db.get_col_ids_with_word_id(word.id)})
+            cols = self.session.get_col_ids_of_words([word.id for word in words])
             self.display_table_cols(self.session.get_cols_from_ids(cols))
 
     def con_btn_word(self):
         sel_rows = qt_helper.table_get_sel_rows(self.table)
         if sel_rows:
             words = [self.mode_storage[idx] for idx in sel_rows]
-            cols = list({col
-                         for word in words
-                         for col in self.session.db.get_col_ids_with_word_id(word.id)})
-            cons = list({con
-                         for col in cols
-                         for con in self.session.db.get_con_ids_with_col_id(col)})
+            cols = self.session.get_col_ids_of_words([word.id for word in words])
+            cons = self.session.get_con_ids_of_cols(cols)
             self.display_table_cons(self.session.get_cons_from_ids(cons))
 
     def sent_btn_word(self):
@@ -418,9 +387,7 @@ class NavigationWidget(QtWidgets.QWidget, Ui_Form, DbConnectionInterface):
         if sel_rows:
             words = [self.mode_storage[idx]
                      for idx in sel_rows]
-            sents = list({sent
-                          for word in words
-                          for sent in self.session.db.get_sentences_id_by_word_id(word.id)})
+            sents = self.session.get_sentence_ids_of_words([word.id for word in words])
             self.display_table_sents(self.session.get_sents_from_ids(sents))
 
     """
@@ -445,9 +412,7 @@ class NavigationWidget(QtWidgets.QWidget, Ui_Form, DbConnectionInterface):
             words = list({word
                           for col in cols
                           for word in col.words})
-            word_inits = list({self.session.db.get_word(word.initial_form_id)
-                               for word in self.session.get_words_from_ids(words)
-                               if word.initial_form_id is not None})
+            word_inits = self.session.get_initial_forms_of_words(self.session.get_words_from_ids(words))
             self.display_table_word_inits(word_inits)
 
     def con_btn_col(self):
@@ -455,9 +420,7 @@ class NavigationWidget(QtWidgets.QWidget, Ui_Form, DbConnectionInterface):
         if sel_rows:
             cols = [self.mode_storage[idx]
                     for idx in sel_rows]
-            cons = list({con
-                         for col in cols
-                         for con in self.session.db.get_con_ids_with_col_id(col.id)})
+            cons = self.session.get_con_ids_of_cols([col.id for col in cols])
             self.display_table_cons(self.session.get_cons_from_ids(cons))
 
     def sent_btn_col(self):
@@ -465,10 +428,7 @@ class NavigationWidget(QtWidgets.QWidget, Ui_Form, DbConnectionInterface):
         if sel_rows:
             cols = [self.mode_storage[idx]
                     for idx in sel_rows]
-            sents = list({sent
-                          for col in cols
-                          for word in col.words
-                          for sent in self.session.db.get_sentences_id_by_word_id(word)})
+            sents = self.session.get_sentence_ids_of_words([word for col in cols for word in col.words])
             self.display_table_sents(self.session.get_sents_from_ids(sents))
 
     def sg_btn_col(self):
@@ -487,23 +447,17 @@ class NavigationWidget(QtWidgets.QWidget, Ui_Form, DbConnectionInterface):
         sel_rows = qt_helper.table_get_sel_rows(self.table)
         if sel_rows:
             cons = [self.mode_storage[idx] for idx in sel_rows]
-            words = list({word
-                          for con in cons
-                          for col_id in (con.predicate, con.object_)
-                          for word in self.session.db.get_col(col_id).words})
+            cols = self.session.get_cols_from_ids([col_id for con in cons for col_id in (con.predicate, con.object_)])
+            words = list({word for col in cols for word in col.words})
             self.display_table_words(self.session.get_words_from_ids(words))
 
     def word_init_btn_con(self):
         sel_rows = qt_helper.table_get_sel_rows(self.table)
         if sel_rows:
             cons = [self.mode_storage[idx] for idx in sel_rows]
-            words = list({word
-                          for con in cons
-                          for col_id in (con.predicate, con.object_)
-                          for word in self.session.db.get_col(col_id).words})
-            word_inits = list({self.session.db.get_word(word.initial_form_id)
-                               for word in self.session.get_words_from_ids(words)
-                               if word.initial_form_id is not None})
+            cols = self.session.get_cols_from_ids([col_id for con in cons for col_id in (con.predicate, con.object_)])
+            words = list({word for col in cols for word in col.words})
+            word_inits = self.session.get_initial_forms_of_words(self.session.get_words_from_ids(words))
             self.display_table_word_inits(word_inits)
 
     def col_btn_con(self):
@@ -519,20 +473,16 @@ class NavigationWidget(QtWidgets.QWidget, Ui_Form, DbConnectionInterface):
         sel_rows = qt_helper.table_get_sel_rows(self.table)
         if sel_rows:
             cons = [self.mode_storage[idx] for idx in sel_rows]
-            sents = list({sent
-                          for con in cons
-                          for col_id in (con.predicate, con.object_)
-                          for word in self.session.db.get_col(col_id).words
-                          for sent in self.session.db.get_sentences_id_by_word_id(word)})
+            cols = self.session.get_cols_from_ids([col_id for con in cons for col_id in (con.predicate, con.object_)])
+            sents = self.session.get_sentence_ids_of_words([word for col in cols for word in col.words])
             self.display_table_sents(self.session.get_sents_from_ids(sents))
 
     def sg_btn_con(self):
         sel_rows = qt_helper.table_get_sel_rows(self.table)
         if sel_rows:
             cons = [self.mode_storage[idx] for idx in sel_rows]
-            sgs = list({self.session.db.get_col(col_id).sg
-                        for con in cons
-                        for col_id in (con.predicate, con.object_)})
+            cols = self.session.get_cols_from_ids([col_id for con in cons for col_id in (con.predicate, con.object_)])
+            sgs = list({col.sg_id for col in cols})
             self.display_table_sgs(self.session.get_sgs_from_ids(sgs))
 
     """
@@ -555,9 +505,7 @@ class NavigationWidget(QtWidgets.QWidget, Ui_Form, DbConnectionInterface):
             words = list({word
                           for sent in sents
                           for word in sent.words})
-            word_inits = list({self.session.db.get_word(word.initial_form_id)
-                               for word in self.session.get_words_from_ids(words)
-                               if word.initial_form_id is not None})
+            word_inits = self.session.get_initial_forms_of_words(self.session.get_words_from_ids(words))
             self.display_table_word_inits(word_inits)
 
     def col_btn_sent(self):
@@ -605,11 +553,12 @@ class NavigationWidget(QtWidgets.QWidget, Ui_Form, DbConnectionInterface):
         if sel_rows:
             sgs = [self.mode_storage[idx] for idx in sel_rows]
             cant_delete = []
-            for sg in sgs:
-                if self.session.db.get_cols_of_sg(sg.id):
-                    cant_delete.append(sg.name)
-                else:
-                    self.session.db.remove_sg(sg)
+            with self.session.db.transaction():
+                for sg in sgs:
+                    if self.session.db.get_cols_of_sg(sg.id):
+                        cant_delete.append(sg.name)
+                    else:
+                        self.session.db.remove_sg(sg.id)
             if cant_delete:
                 msg = QtWidgets.QErrorMessage(self)
                 msg.showMessage("Нельзя удалить семантические роли: %s (к ним привязаны сочетания)")
@@ -618,43 +567,31 @@ class NavigationWidget(QtWidgets.QWidget, Ui_Form, DbConnectionInterface):
         sel_rows = qt_helper.table_get_sel_rows(self.table)
         if sel_rows:
             sgs = [self.mode_storage[idx] for idx in sel_rows]
-            words = list({word
-                          for sg in sgs
-                          for word in self.session.get_words_of_sg(sg.id)})
+            words = self.session.get_word_ids_of_sgs([sg.id for sg in sgs])
             self.display_table_words(self.session.get_words_from_ids(words))
 
     def word_init_btn_sg(self):
         sel_rows = qt_helper.table_get_sel_rows(self.table)
         if sel_rows:
             sgs = [self.mode_storage[idx] for idx in sel_rows]
-            words = list({word
-                          for sg in sgs
-                          for word in self.session.get_words_of_sg(sg.id)})
-            word_inits = list({self.session.db.get_word(word.initial_form_id)
-                               for word in self.session.get_words_from_ids(words)
-                               if word.initial_form_id is not None})
+            words = self.session.get_word_ids_of_sgs([sg.id for sg in sgs])
+            word_inits = self.session.get_initial_forms_of_words(self.session.get_words_from_ids(words))
             self.display_table_word_inits(word_inits)
 
     def col_btn_sg(self):
         sel_rows = qt_helper.table_get_sel_rows(self.table)
         if sel_rows:
             sgs = [self.mode_storage[idx] for idx in sel_rows]
-            sg_ids = [sg.id for sg in sgs]
-            cols = list(col
-                        for col in self.session.db.get_all_cols()
-                        if col.sg_id in sg_ids)
-            self.display_table_cols(cols)
+            cols = self.session.get_col_ids_of_sgs([sg.id for sg in sgs])
+            self.display_table_cols(self.session.get_cols_from_ids(cols))
 
     def con_btn_sg(self):
         sel_rows = qt_helper.table_get_sel_rows(self.table)
         if sel_rows:
             sgs = [self.mode_storage[idx] for idx in sel_rows]
-            sg_ids = [sg.id for sg in sgs]
-            cons = [con
-                    for con in self.session.db.get_all_cons()
-                    if self.session.db.get_col(con.predicate).sg_id in sg_ids
-                    or self.session.db.get_col(con.object_).sg_id in sg_ids]
-            self.display_table_cons(cons)
+            cols = self.session.get_col_ids_of_sgs([sg.id for sg in sgs])
+            cons = self.session.get_con_ids_of_cols(cols)
+            self.display_table_cons(self.session.get_cons_from_ids(cons))
 
     def change_name_btn_sg(self):
        sel_rows = qt_helper.table_get_sel_rows(self.table)
@@ -664,7 +601,7 @@ class NavigationWidget(QtWidgets.QWidget, Ui_Form, DbConnectionInterface):
             new_name, is_valid = QtWidgets.QInputDialog.getText(self, "Изменение названия", "Введите название:")
             if is_valid:
                 self.session.db.change_sg_name(sg.id, new_name)
-                self.display_table_sgs([self.session.db.get_sg(sg.id) for sg in self.mode_storage])
+                self.display_table_sgs([self.session.get_sg(sg.id) for sg in self.mode_storage])
 
     """
     INIT WORDS
@@ -674,56 +611,39 @@ class NavigationWidget(QtWidgets.QWidget, Ui_Form, DbConnectionInterface):
         sel_rows = qt_helper.table_get_sel_rows(self.table)
         if sel_rows:
             word_inits = [self.mode_storage[idx] for idx in sel_rows]
-            words = list({word
-                          for word_init in word_inits
-                          for word in self.session.db.get_words_with_initial_form(word_init.id)})
+            words = self.session.get_word_ids_with_initial_forms([word.id for word in word_inits])
             self.display_table_words(self.session.get_words_from_ids(words))
 
     def col_btn_init_word(self):
         sel_rows = qt_helper.table_get_sel_rows(self.table)
         if sel_rows:
             word_inits = [self.mode_storage[idx] for idx in sel_rows]
-            words = list({word
-                          for word_init in word_inits
-                          for word in self.session.db.get_words_with_initial_form(word_init.id)})
-            cols = list({col
-                         for word in words
-                         for col in self.session.db.get_col_ids_with_word_id(word.id)})
+            words = self.session.get_word_ids_with_initial_forms([word.id for word in word_inits])
+            cols = self.session.get_col_ids_of_words(words)
             self.display_table_cols(self.session.get_cols_from_ids(cols))
 
     def con_btn_init_word(self):
         sel_rows = qt_helper.table_get_sel_rows(self.table)
         if sel_rows:
             word_inits = [self.mode_storage[idx] for idx in sel_rows]
-            words = list({word
-                          for word_init in word_inits
-                          for word in self.session.db.get_words_with_initial_form(word_init.id)})
-            cols = list({col
-                         for word in words
-                         for col in self.session.db.get_col_ids_with_word_id(word.id)})
-            cons = list({con
-                         for col in cols
-                         for con in self.session.db.get_con_ids_with_col_id(col)})
+            words = self.session.get_word_ids_with_initial_forms([word.id for word in word_inits])
+            cols = self.session.get_col_ids_of_words(words)
+            cons = self.session.get_con_ids_of_cols(cols)
             self.display_table_cons(self.session.get_cons_from_ids(cons))
 
     def sent_btn_init_word(self):
         sel_rows = qt_helper.table_get_sel_rows(self.table)
         if sel_rows:
             word_inits = [self.mode_storage[idx] for idx in sel_rows]
-            words = list({word
-                          for word_init in word_inits
-                          for word in self.session.db.get_words_with_initial_form(word_init.id)})
-            sents = list({sent
-                          for word in words
-                          for sent in self.session.db.get_sentences_id_by_word_id(word)})
+            words = self.session.get_word_ids_with_initial_forms([word.id for word in word_inits])
+            sents = self.session.get_sentence_ids_of_words(words)
             self.display_table_sents(self.session.get_sents_from_ids(sents))
 
     def delete_btn_sent(self):
         sel_rows = qt_helper.table_get_sel_rows(self.table)
         if sel_rows:
             sents = [self.mode_storage[idx] for idx in sel_rows]
-            for sent in sents:
-                self.session.db.delete_sentence(sent.id)
+            self.session.db.delete_sentences([sent.id for sent in sents])
             new_sents = list(filter(lambda it: it not in sents, self.mode_storage))
             self.display_table_sents(new_sents)
 
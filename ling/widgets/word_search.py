@@ -1,8 +1,13 @@
-from PyQt5 import QtWidgets, uic
+from PyQt5 import QtWidgets, QtCore, uic
 
 from ling.session import Session
 from uis_generated.word_search import Ui_Dialog
 
+# Delay after last keystroke before completions are queried, in ms
+COMPLETION_DELAY = 150
+# Number of completions shown
+COMPLETION_COUNT = 10
+
 
 class WordSearchDialog(QtWidgets.QDialog, Ui_Dialog):
     def __init__(self, session: Session, parent=None):
@@ -10,3 +15,27 @@ class WordSearchDialog(QtWidgets.QDialog, Ui_Dialog):
         self.session = session
         self.setupUi(self)
         # uic.loadUi("uis/word_search.ui", self)
+
+        # Completions are already filtered by database, so completer should show them as is
+        self.completion_model = QtCore.QStringListModel(self)
+        self.completer = QtWidgets.QCompleter(self.completion_model, self)
+        self.completer.setCompletionMode(QtWidgets.QCompleter.UnfilteredPopupCompletion)
+        self.input.setCompleter(self.completer)
+
+        # Typing restarts timer, so database is queried only when user stops typing
+        self.completion_timer = QtCore.QTimer(self)
+        self.completion_timer.setSingleShot(True)
+        self.completion_timer.setInterval(COMPLETION_DELAY)
+        self.completion_timer.timeout.connect(lambda: self.update_completions())
+        self.input.textEdited.connect(lambda _: self.completion_timer.start())
+
+    def update_completions(self):
+        prefix = self.input.text().strip()
+        # Phrases are searched in sentences, so only single words are completed
+        if not prefix or " " in prefix or not self.session.connected:
+            self.completion_model.setStringList([])
+            return
+        completions = self.session.db.get_word_completions(prefix, COMPLETION_COUNT)
+        self.completion_model.setStringList(completions)
+        if completions:
+            self.completer.complete()
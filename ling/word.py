@@ -4,12 +4,63 @@ import os
 import pathlib
 if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
     os.environ["PYMORPHY2_DICT_PATH"] = str(pathlib.Path(sys._MEIPASS).joinpath('pymorphy2_dicts_ru/data'))
-import pymorphy2
 import typing
+import collections
 import functools
+import importlib.metadata
+import logging
+import multiprocessing
+import threading
+import time
 
 
-morph = pymorphy2.MorphAnalyzer()
+# Default number of analysed words kept in memory
+ANALYSIS_CACHE_SIZE = 16384
+# Batches with fewer unique words are analysed in this process, starting workers costs more than it saves
+PARALLEL_MIN_WORDS = 5000
+# Number of words sent to worker process at once
+PARALLEL_CHUNK_SIZE = 1000
+# Seconds per chunk after which workers are considered stuck and words are analysed in this process.
+#  Workers are forked while other threads run, so a lock held by one of them at fork would never be released
+PARALLEL_CHUNK_TIMEOUT = 10.0
+
+# Loading of dictionaries takes a few seconds, so analyzer is created on first use by get_morph_analyzer
+morph: typing.Union["pymorphy2.MorphAnalyzer", None] = None
+morph_lock = threading.Lock()
+
+
+def get_morph_analyzer() -> "pymorphy2.MorphAnalyzer":
+    """Returns analyzer shared by whole process, creating it on first call"""
+    global morph
+    if morph is None:
+        with morph_lock:
+            if morph is None:
+                start_time = time.perf_counter()
+                import pymorphy2
+                morph = pymorphy2.MorphAnalyzer()
+                logging.info("Loaded morphological analyzer in %.3fs", time.perf_counter() - start_time)
+    return morph
+
+
+def get_morph_version() -> str:
+    """
+    Returns string identifying analyzer and its dictionaries, results of analysis don't change while it is the same.
+    Version is taken from installed packages if possible, so analyzer doesn't have to be loaded
+    """
+    try:
+        return "pymorphy2 %s, dicts %s" % (importlib.metadata.version("pymorphy2"),
+                                           importlib.metadata.version("pymorphy2-dicts-ru"))
+    except importlib.metadata.PackageNotFoundError:
+        # main.spec bundles package metadata, without it analyzer is loaded here, which is slow
+        meta = getattr(get_morph_analyzer().dictionary, "meta", None) or {}
+        return "pymorphy2 dictionary compiled at %s" % meta.get("compiled_at", "unknown")
+
+
+def warm_up_morph_analyzer() -> threading.Thread:
+    """Starts creating analyzer in background thread, so it is likely ready when first word is analysed"""
+    thread = threading.Thread(target=get_morph_analyzer, name="morph-warm-up", daemon=True)
+    thread.start()
+    return thread
 
 
 POS_NONE = 0x0
@@ -29,27 +80,84 @@ POS_INTJ = 0xD  # междометие
 POS_ADVB = 0xE  # наречие
 
 
+PYMORPHY_TO_POS = {
+    "NOUN": POS_NOUN,
+    "ADJF": POS_ADJ,
+    "ADJS": POS_ADJ,
+    "COMP": POS_COMP,
+    "VERB": POS_VERB,
+    "INFN": POS_VERB,
+    "PRTF": POS_PRT,
+    "PRTS": POS_PRT,
+    "GRND": POS_GRND,
+    "NUMR": POS_NUMR,
+    "ADVB": POS_ADVB,
+    "NPRO": POS_NPRO,
+    "PRED": POS_PRED,
+    "PREP": POS_PREP,
+    "CONJ": POS_CONJ,
+    "PRCL": POS_PRCL,
+    "INTJ": POS_INTJ,
+}
+
+
 def pos_from_pymorphy_str(pm: str):
-    pymorphy_to_pos_dict = {
-        "NOUN": POS_NOUN,
-        "ADJF": POS_ADJ,
-        "ADJS": POS_ADJ,
-        "COMP": POS_COMP,
-        "VERB": POS_VERB,
-        "INFN": POS_VERB,
-        "PRTF": POS_PRT,
-        "PRTS": POS_PRT,
-        "GRND": POS_GRND,
-        "NUMR": POS_NUMR,
-        "ADVB": POS_ADVB,
-        "NPRO": POS_NPRO,
-        "PRED": POS_PRED,
-        "PREP": POS_PREP,
-        "CONJ": POS_CONJ,
-        "PRCL": POS_PRCL,
-        "INTJ": POS_INTJ,
-    }
-    return pymorphy_to_pos_dict.get(pm, POS_NONE)
+    return PYMORPHY_TO_POS.get(pm, POS_NONE)
+
+
+# Grammemes of pymorphy2 (OpenCorpora) tags stored in word bitmasks, grammeme GRAMMEMES[i] is bit 1 << i.
+#  Masks are stored in database, so grammemes can only be appended. Stylistic and rare grammemes are
+#  not stored, because mask has to fit in 63 bits of SQLite integer
+GRAMMEMES = [
+    # Parts of speech
+    "NOUN", "ADJF", "ADJS", "COMP", "VERB", "INFN", "PRTF", "PRTS", "GRND",
+    "NUMR", "ADVB", "NPRO", "PRED", "PREP", "CONJ", "PRCL", "INTJ",
+    # Animacy
+    "anim", "inan",
+    # Gender
+    "masc", "femn", "neut", "Ms-f",
+    # Number
+    "sing", "plur", "Sgtm", "Pltm", "Fixd",
+    # Case
+    "nomn", "gent", "datv", "accs", "ablt", "loct", "voct", "gen1", "gen2", "acc2", "loc1", "loc2",
+    # Aspect, transitivity, person, tense, mood, involvement, voice
+    "perf", "impf",
+    "tran", "intr",
+    "1per", "2per", "3per",
+    "pres", "past", "futr",
+    "indc", "impr",
+    "incl", "excl",
+    "actv", "pssv",
+    # Proper names and abbreviations
+    "Name", "Surn", "Patr", "Geox", "Orgn", "Abbr",
+]
+assert len(GRAMMEMES) <= 63
+GRAMMEME_BITS = {name: 1 << idx for idx, name in enumerate(GRAMMEMES)}
+
+
+def grammemes_to_mask(grammemes: typing.Iterable[str]) -> int:
+    """Returns bitmask of grammemes, grammemes not in GRAMMEMES are skipped"""
+    result = 0
+    for grammeme in grammemes:
+        result |= GRAMMEME_BITS.get(grammeme, 0)
+    return result
+
+
+@functools.lru_cache(256)
+def grammemes_text_to_mask(text: str) -> int:
+    """
+    Returns bitmask of comma or space separated grammemes, like 'NOUN,ablt'.
+    Raises ValueError for unknown grammemes, so typos in filters don't match everything silently
+    """
+    names = [it for it in text.replace(",", " ").split() if it]
+    unknown = [it for it in names if it not in GRAMMEME_BITS]
+    if unknown:
+        raise ValueError("Unknown grammemes: %s" % ", ".join(unknown))
+    return grammemes_to_mask(names)
+
+
+def mask_to_grammemes(mask: int) -> typing.List[str]:
+    return [name for name, bit in GRAMMEME_BITS.items() if mask & bit]
 
 
 def pos_to_russian(pos: int):
@@ -78,14 +186,121 @@ class Word:
     word: str
     initial_form: typing.Union[str, None]
     part_of_speech: int
+    # Bitmask of GRAMMEMES
+    grammemes: int = 0
+
+
+@dataclasses.dataclass
+class AnalysisCacheStats:
+    """Counters of analysis cache"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    # Number of entries currently stored
+    size: int = 0
+    # Rough estimate of memory taken by entries in bytes
+    nbytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class AnalysisCache:
+    """
+    Results of analyse_word by word. Least recently used results are evicted when there are more than
+    max_size of them, max_size of None means cache is not limited
+    """
+
+    def __init__(self, max_size: typing.Union[int, None] = ANALYSIS_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries: collections.OrderedDict = collections.OrderedDict()
+        self.stats = AnalysisCacheStats()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def entry_nbytes(word: str, result: typing.Union[Word, None]) -> int:
+        # Word strings are shared by key and result, so they are counted once.
+        #  Last term is OrderedDict overhead per entry
+        nbytes = sys.getsizeof(word) + 100
+        if result is not None:
+            nbytes += sys.getsizeof(result) + sys.getsizeof(result.__dict__)
+            if result.initial_form is not None:
+                nbytes += sys.getsizeof(result.initial_form)
+        return nbytes
+
+    def get(self, word: str) -> typing.Tuple[bool, typing.Union[Word, None]]:
+        """Returns whether word is cached and its result, result itself can be None"""
+        with self.lock:
+            if word in self.entries:
+                self.entries.move_to_end(word)
+                self.stats.hits += 1
+                return True, self.entries[word]
+            self.stats.misses += 1
+            return False, None
+
+    def put(self, word: str, result: typing.Union[Word, None]):
+        with self.lock:
+            if word in self.entries:
+                self.stats.nbytes -= self.entry_nbytes(word, self.entries[word])
+            self.entries[word] = result
+            self.entries.move_to_end(word)
+            self.stats.nbytes += self.entry_nbytes(word, result)
+            self.evict_internal()
+
+    def evict_internal(self):
+        while self.max_size is not None and len(self.entries) > self.max_size:
+            word, result = self.entries.popitem(last=False)
+            self.stats.nbytes -= self.entry_nbytes(word, result)
+            self.stats.evictions += 1
+
+    def set_max_size(self, max_size: typing.Union[int, None]):
+        with self.lock:
+            self.max_size = max_size
+            self.evict_internal()
+
+    def get_stats(self) -> AnalysisCacheStats:
+        with self.lock:
+            return dataclasses.replace(self.stats, size=len(self.entries))
+
+
+analysis_cache = AnalysisCache()
+
+
+def set_analysis_cache_size(max_size: typing.Union[int, None]):
+    """Limits number of cached analysis results, None removes limit, which is useful for imports of large texts"""
+    analysis_cache.set_max_size(max_size)
+    logging.info("Analysis cache size set to %s", "unlimited" if max_size is None else max_size)
+
+
+def get_analysis_cache_size() -> typing.Union[int, None]:
+    return analysis_cache.max_size
+
+
+def get_analysis_cache_stats() -> AnalysisCacheStats:
+    return analysis_cache.get_stats()
+
+
+def log_analysis_cache_stats():
+    stats = analysis_cache.get_stats()
+    logging.info("Analysis cache: %d entries, ~%d bytes, %d hits, %d misses (%.1f%%), %d evictions",
+                 stats.size, stats.nbytes, stats.hits, stats.misses, stats.hit_rate * 100, stats.evictions)
 
 
-@functools.lru_cache(1024)
 def analyse_word(word: str) -> typing.Union[Word, None]:
+    found, result = analysis_cache.get(word)
+    if not found:
+        result = analyse_word_internal(word)
+        analysis_cache.put(word, result)
+    return result
+
+
+def analyse_word_internal(word: str) -> typing.Union[Word, None]:
     if word.isnumeric():
-        return Word(word, None, POS_NUMR)
+        return Word(word, None, POS_NUMR, GRAMMEME_BITS["NUMR"])
 
-    parse_results = morph.parse(word)
+    parse_results = get_morph_analyzer().parse(word)
     if parse_results:
         form = parse_results[0]
         initial_form = form.normal_form
@@ -93,5 +308,58 @@ def analyse_word(word: str) -> typing.Union[Word, None]:
         # because the only other parameter we currently have is
         initial_form = initial_form if initial_form != word else None
         part_of_speech = pos_from_pymorphy_str(form.tag.POS)
-        word = Word(word, initial_form, part_of_speech)
-        return word
\ No newline at end of file
+        word = Word(word, initial_form, part_of_speech, grammemes_to_mask(form.tag.grammemes))
+        return word
+
+
+def analyse_words_chunk_internal(words: typing.List[str]) -> typing.List[typing.Union[Word, None]]:
+    # Workers don't use cache, results are cached by process which started them
+    return [analyse_word_internal(it) for it in words]
+
+
+def analyse_words(words: typing.Iterable[str], processes: typing.Union[int, None] = None) \
+        -> typing.List[typing.Union[Word, None]]:
+    """
+    Analyses words like analyse_word and returns results in order of words. Each distinct word is analysed once.
+    Large batches are split across worker processes. They are forked after analyzer is loaded,
+    so dictionaries are shared with this process instead of being loaded by each worker.
+    Analysis falls back to this process if there are few words, fork is not available or workers fail or get stuck.
+    scripts/bench_analyse_words.py compares both ways
+    """
+    words = list(words)
+    results = {}
+    unique = []
+    for word in dict.fromkeys(words):
+        found, result = analysis_cache.get(word)
+        if found:
+            results[word] = result
+        else:
+            unique.append(word)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = min(processes, len(unique) // PARALLEL_CHUNK_SIZE)
+
+    analysed = None
+    if len(unique) >= PARALLEL_MIN_WORDS and processes > 1 \
+            and "fork" in multiprocessing.get_all_start_methods():
+        get_morph_analyzer()
+        start_time = time.perf_counter()
+        chunks = [unique[idx:idx + PARALLEL_CHUNK_SIZE] for idx in range(0, len(unique), PARALLEL_CHUNK_SIZE)]
+        try:
+            with multiprocessing.get_context("fork").Pool(processes) as pool:
+                chunk_results = pool.map_async(analyse_words_chunk_internal, chunks)
+                analysed = [word for chunk in chunk_results.get(PARALLEL_CHUNK_TIMEOUT * len(chunks))
+                            for word in chunk]
+            logging.info("Analysed %d words in %d processes in %.3fs",
+                         len(unique), processes, time.perf_counter() - start_time)
+        except (OSError, multiprocessing.ProcessError):
+            logging.exception("Failed to analyse words in worker processes, analysing in this process")
+    if analysed is None:
+        analysed = analyse_words_chunk_internal(unique)
+
+    for word, result in zip(unique, analysed):
+        analysis_cache.put(word, result)
+        results[word] = result
+    if unique:
+        log_analysis_cache_stats()
+    return [results[it] for it in words]
@@ -4,11 +4,14 @@ from PyQt5.QtWidgets import QApplication
 
 from ling.session import Session
 import ling.widgets.window
+import ling.word
 from ling import logger
 
 
 def main():
     logger.init_logger()
+    # Dictionaries are loaded while window is created
+    ling.word.warm_up_morph_analyzer()
 
     app = QApplication(sys.argv)
     session = Session()
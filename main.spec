@@ -2,14 +2,17 @@
 
 
 block_cipher = None
+from PyInstaller.utils.hooks import copy_metadata
 import pymorphy2_dicts_ru
 pymorph_data = pymorphy2_dicts_ru.get_path()
+# Versions of analyzer packages are read by ling.word.get_morph_version without loading dictionaries
+pymorph_metadata = copy_metadata("pymorphy2") + copy_metadata("pymorphy2-dicts-ru")
 
 
 a = Analysis(['main.py'],
              pathex=[],
              binaries=[],
-            datas=[(pymorph_data, 'pymorphy2_dicts_ru/data'), ("sql/tables.sql", ".")],
+            datas=[(pymorph_data, 'pymorphy2_dicts_ru/data'), ("sql/tables.sql", ".")] + pymorph_metadata,
              hiddenimports=[],
              hookspath=[],
              hooksconfig={},
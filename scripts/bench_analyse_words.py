@@ -0,0 +1,90 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import ling.db
+import ling.word
+
+# Compares serial and multi-process ling.word.analyse_words.
+# Workers are forked while the app's usual background threads run: analyzer warm-up, fuzzy index build
+# and threads querying reader connections, so it is also checked that fork under them doesn't hang
+
+LETTERS = "абвгдежзийклмнопрстуфхцчшщыьэюя"
+ENDINGS = ["", "а", "ы", "ом", "ой", "ами", "ах", "ет", "ют", "ал", "ла", "ли", "ть", "ий", "ая", "ое", "ых"]
+
+
+def make_words(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return ["".join(rng.choice(LETTERS) for _ in range(rng.randint(3, 8))) + rng.choice(ENDINGS)
+            for _ in range(count)]
+
+
+def start_background_threads(db: ling.db.DB, stop: threading.Event, readers: int) -> list:
+    threads = [ling.word.warm_up_morph_analyzer()]
+    db.start_fuzzy_index_build()
+
+    def query():
+        try:
+            while not stop.is_set():
+                db.get_corpus_stats()
+                db.search_words_by_prefix("ка", 20)
+        finally:
+            db.close_thread_connection()
+
+    for idx in range(readers):
+        thread = threading.Thread(target=query, name="reader-%d" % idx, daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
+
+
+def measure(words: list, processes: int) -> tuple:
+    ling.word.set_analysis_cache_size(0)
+    start_time = time.perf_counter()
+    result = ling.word.analyse_words(words, processes)
+    return time.perf_counter() - start_time, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares serial and multi-process word analysis")
+    parser.add_argument("--words", type=int, default=100000, help="number of distinct words analysed")
+    parser.add_argument("--vocabulary", type=int, default=200000, help="number of words in database")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--readers", type=int, default=3, help="number of threads querying database meanwhile")
+    args = parser.parse_args()
+
+    words = make_words(args.words, 1)
+    with tempfile.TemporaryDirectory() as directory:
+        db = ling.db.DB()
+        db.create_or_open(os.path.join(directory, "bench.sqlite"))
+        with db.transaction():
+            db.cursor.executemany("""insert or ignore into word (word, part_of_speech, has_initial_form, grammemes)
+                                     values (?, 0, 0, 0)""", [(it,) for it in make_words(args.vocabulary, 2)])
+
+        stop = threading.Event()
+        threads = start_background_threads(db, stop, args.readers)
+        ling.word.get_morph_analyzer()
+        print("cpus %d, processes %d, %d words, %d background threads running"
+              % (os.cpu_count() or 1, args.processes, len(words), threading.active_count() - 1))
+
+        serial_time, serial = measure(words, 1)
+        print("serial   %.3fs, %.0f words/s" % (serial_time, len(words) / serial_time))
+        pool_time, pooled = measure(words, args.processes)
+        print("pool     %.3fs, %.0f words/s, speedup %.2fx" % (pool_time, len(words) / pool_time,
+                                                               serial_time / pool_time))
+        assert pooled == serial, "Results of pool differ from serial analysis"
+        print("fuzzy index build finished before end: %s" % (db.fuzzy_index is not None))
+
+        stop.set()
+        for thread in threads:
+            thread.join()
+        ling.word.set_analysis_cache_size(ling.word.ANALYSIS_CACHE_SIZE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import ling.session
+import ling.sentence
+
+# Checks that in-memory state of DB is not changed by rolled back transactions
+
+
+def open_session(directory: str) -> ling.session.Session:
+    # Config of user is not read or changed
+    ling.session.get_config_filename = lambda: os.path.join(directory, ".ling")
+    session = ling.session.Session()
+    session.init_for_db(os.path.join(directory, "check.sqlite"), save_config=False)
+    return session
+
+
+def check_word_ids(session: ling.session.Session):
+    db = session.db
+    db.get_or_insert_word("кот")
+    try:
+        with db.transaction():
+            with db.transaction():
+                db.get_or_insert_word("коты")
+            raise RuntimeError("rollback")
+    except RuntimeError:
+        pass
+    assert "коты" not in db.word_ids, db.word_ids
+
+    # Id of rolled back word is reused by SQLite, so stale word_ids entry would reference other word
+    sentence = ling.sentence.Sentence(session, "Коты ловят")
+    db.add_sentence_records([sentence])
+    word_ids = db.execute("select word_id from sentence_word_junction order by idx")
+    words = db.get_words(word_ids)
+    assert None not in words, words
+    assert [it.word for it in words] == ["коты", "ловят"], words
+
+    with db.transaction():
+        db.get_or_insert_word("мыши")
+    assert db.word_ids["мыши"] == db.execute("select id from word where word = 'мыши'")[0]
+
+
+def check_fuzzy_index(session: ling.session.Session):
+    db = session.db
+    db.get_fuzzy_index_internal()
+    sentence = ling.sentence.Sentence(session, "Собаки ловят")
+    db.add_sentence_records([sentence])
+    sentence_id = db.execute("select id from sentence where contents = 'Собаки ловят'")[0]
+    try:
+        with db.transaction():
+            db.delete_sentences([sentence_id])
+            raise RuntimeError("rollback")
+    except RuntimeError:
+        pass
+    assert [word for word, _ in db.get_fuzzy_index_internal().lookup("собаки", 0)] == ["собаки"]
+    assert db.search_words_fuzzy("собаки", 0), "Word of rolled back deletion is not found"
+
+    try:
+        with db.transaction():
+            db.get_or_insert_word("кошки")
+            raise RuntimeError("rollback")
+    except RuntimeError:
+        pass
+    assert not db.get_fuzzy_index_internal().lookup("кошки", 0)
+
+    db.delete_sentences([sentence_id])
+    assert not db.get_fuzzy_index_internal().lookup("собаки", 0)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        session = open_session(directory)
+        check_word_ids(session)
+        check_fuzzy_index(session)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,14 @@ import sys
 sys.path.append("../ling")
 import ling.session
 import ling.sentence
+import ling.word
 
 
 db_name = "test.sqlite"
 
 try:
+    # All sentences are imported at once, so analysis results are kept for whole import
+    ling.word.set_analysis_cache_size(None)
     session = ling.session.Session()
     session.init_for_db(db_name)
     db = session.db
@@ -22,7 +25,8 @@ try:
     regime = db.add_sg("Режим")
     angle = db.add_sg("Угол наклона")
     speed = db.add_sg("Скорость")
-    
+    sentences = []
+
     sentence = ling.sentence.Sentence(session,
         "Лётчик пилотировал самолет боковой ручкой управления на аэродроме с нежестким покрытием в плохую погоду.")
     sentence.make_col([0], agent)
@@ -32,7 +36,7 @@ try:
     sentence.make_col([7, 8, 9, 10, 11], locative)
     sentence.make_col([12, 13], weather)
     sentence.make_default_cons()
-    db.add_or_update_sentence_record(sentence)
+    sentences.append(sentence)
 
     sentence = ling.sentence.Sentence(session,
         "Робот пилотировал корабль на базу «Север».")
@@ -41,7 +45,7 @@ try:
     sentence.make_col([2], object_)
     sentence.make_col([3, 4, 5], locative)
     sentence.make_default_cons()
-    db.add_or_update_sentence_record(sentence)
+    sentences.append(sentence)
 
     sentence = ling.sentence.Sentence(session,
         "Пилотировать самолёт, строго придерживаясь зоны пилотирования.")
@@ -49,7 +53,7 @@ try:
     sentence.make_col([1], agent)
     sentence.make_col([4, 5], locative)
     sentence.make_default_cons()
-    db.add_or_update_sentence_record(sentence)
+    sentences.append(sentence)
 
     sentence = ling.sentence.Sentence(session,
                                       "Независимо от метеоусловий и видимости производить фигуры высшего пилотажа на высоте 13.000 фунтов.")
@@ -58,7 +62,7 @@ try:
     sentence.make_col([6, 7, 8], object_)
     sentence.make_col([9, 10, 11, 12], height)
     sentence.make_default_cons()
-    db.add_or_update_sentence_record(sentence)
+    sentences.append(sentence)
 
     sentence = ling.sentence.Sentence(session,
         "Взлёт производить на взлётном режиме работы двигателей с закрылками, выпущенными на 20° и 10°.");
@@ -67,7 +71,7 @@ try:
     sentence.make_col([3, 4, 5, 6, 7, 8], regime)
     sentence.make_col([11, 12, 13], angle)
     sentence.make_default_cons()
-    db.add_or_update_sentence_record(sentence)
+    sentences.append(sentence)
 
     sentence = ling.sentence.Sentence(session,
                                       "Дальнейший полёт производить на скорости 380-420 км/ч на высоте ближайшего эшелона.")
@@ -76,6 +80,8 @@ try:
     sentence.make_col([4, 5, 6, 7, 8], speed)
     sentence.make_col([10, 11, 12], height)
     sentence.make_default_cons()
-    db.add_or_update_sentence_record(sentence)
+    sentences.append(sentence)
+
+    db.add_sentence_records(sentences)
 except Exception:
     traceback.print_exc()
@@ -1,3 +1,7 @@
+create table if not exists schema_version (
+    version integer not null
+);
+
 create table if not exists semantic_group (
     id integer primary key,
     name text not null